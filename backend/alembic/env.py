@@ -12,7 +12,7 @@ from alembic import context
 # Импорт настроек и моделей
 from app.core.config import settings
 from app.db.database import Base
-from app.db.models import User, AuditLog  # Импортируем все модели
+from app.db.models import User, AuditLog, AuditLogHourly, AuditLogDaily, ProductViewStat, RateLimitCounter, Product  # Импортируем все модели
 
 # this is the Alembic Config object
 config = context.config
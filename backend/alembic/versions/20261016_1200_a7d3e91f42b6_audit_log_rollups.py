@@ -0,0 +1,51 @@
+"""Audit log rollups
+
+Revision ID: a7d3e91f42b6
+Revises: cfb4b2e103c0
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e91f42b6'
+down_revision = 'cfb4b2e103c0'
+branch_labels = None
+depends_on = None
+
+
+ROLLUPS = (("audit_log_hourly", "hour"), ("audit_log_daily", "day"))
+
+
+def upgrade() -> None:
+    # Типы enum уже созданы миграцией 4c219ec3d105
+    operation_type = postgresql.ENUM(name='operationtype', create_type=False)
+    status_type = postgresql.ENUM(name='statustype', create_type=False)
+
+    for table, precision in ROLLUPS:
+        op.create_table(table,
+        sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('operation', operation_type, nullable=False),
+        sa.Column('status', status_type, nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket', 'operation', 'status', 'username')
+        )
+
+        # Заполнение агрегатов по уже накопленному журналу
+        op.execute(f"""
+            INSERT INTO {table} (bucket, operation, status, username, count)
+            SELECT date_trunc('{precision}', "timestamp", 'UTC'), operation, status,
+                   coalesce(username, ''), count(*)
+            FROM audit_log
+            WHERE "timestamp" IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+        """)
+
+
+def downgrade() -> None:
+    for table, _ in reversed(ROLLUPS):
+        op.drop_table(table)
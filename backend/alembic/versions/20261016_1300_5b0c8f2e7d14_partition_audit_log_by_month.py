@@ -0,0 +1,111 @@
+"""Partition audit_log by month
+
+Revision ID: 5b0c8f2e7d14
+Revises: a7d3e91f42b6
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from datetime import date, datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b0c8f2e7d14'
+down_revision = 'a7d3e91f42b6'
+branch_labels = None
+depends_on = None
+
+
+# Сколько месяцев вперед создать секции (дальше их создает app.db.partitions)
+PARTITIONS_AHEAD = 3
+
+COLUMNS = "id, timestamp, user_id, username, role, operation, target_table, target_id, status, ip_address, details"
+
+TABLE_COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('audit_log_id_seq'),
+    "timestamp" timestamp with time zone NOT NULL DEFAULT now(),
+    user_id integer,
+    username varchar(50),
+    role varchar(20),
+    operation operationtype NOT NULL,
+    target_table varchar(50),
+    target_id integer,
+    status statustype NOT NULL,
+    ip_address varchar(45),
+    details text
+"""
+
+INDEXED_COLUMNS = ("timestamp", "operation", "status")
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _detach_old_table(name: str) -> None:
+    """Переименование audit_log в name с освобождением имен индексов и последовательности"""
+    for column in INDEXED_COLUMNS:
+        op.execute(f"DROP INDEX IF EXISTS ix_audit_log_{column}")
+    op.execute("DROP INDEX IF EXISTS ix_audit_log_id")
+    op.execute(f"ALTER TABLE audit_log RENAME TO {name}")
+    op.execute(f"ALTER TABLE {name} RENAME CONSTRAINT audit_log_pkey TO {name}_pkey")
+    op.execute(f"ALTER TABLE {name} ALTER COLUMN id DROP DEFAULT")
+    op.execute("ALTER SEQUENCE audit_log_id_seq OWNED BY NONE")
+
+
+def _finish_new_table(old_name: str, timestamp_expr: str) -> None:
+    """Перенос данных, индексы, последовательность, удаление старой таблицы"""
+    op.execute("ALTER SEQUENCE audit_log_id_seq OWNED BY audit_log.id")
+    op.execute(f"""
+        INSERT INTO audit_log ({COLUMNS.replace('timestamp', '"timestamp"')})
+        SELECT {COLUMNS.replace('timestamp', timestamp_expr)} FROM {old_name}
+    """)
+    op.execute("SELECT setval('audit_log_id_seq', coalesce((SELECT max(id) FROM audit_log), 0) + 1, false)")
+    op.execute(f"DROP TABLE {old_name}")
+    for column in INDEXED_COLUMNS:
+        op.create_index(f'ix_audit_log_{column}', 'audit_log', [column], unique=False)
+
+
+def upgrade() -> None:
+    _detach_old_table("audit_log_old")
+
+    op.execute(f"""
+        CREATE TABLE audit_log ({TABLE_COLUMNS},
+            CONSTRAINT audit_log_pkey PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+    """)
+    # Страховочная секция для событий вне созданных диапазонов
+    op.execute("CREATE TABLE audit_log_default PARTITION OF audit_log DEFAULT")
+
+    # Секции с месяца самого раннего события до PARTITIONS_AHEAD месяцев вперед
+    now = datetime.now(timezone.utc)
+    oldest = op.get_bind().execute(sa.text(
+        """SELECT min("timestamp") FROM audit_log_old"""
+    )).scalar() or now
+    oldest = oldest.astimezone(timezone.utc) if oldest.tzinfo else oldest
+    month = date(oldest.year, oldest.month, 1)
+    last = _add_months(date(now.year, now.month, 1), PARTITIONS_AHEAD)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE audit_log_y{month.year:04d}m{month.month:02d} PARTITION OF audit_log "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+        )
+        month = upper
+
+    _finish_new_table("audit_log_old", 'coalesce("timestamp", now())')
+
+
+def downgrade() -> None:
+    _detach_old_table("audit_log_partitioned")
+
+    op.execute(f"""
+        CREATE TABLE audit_log ({TABLE_COLUMNS.replace('NOT NULL DEFAULT now()', 'DEFAULT now()')},
+            CONSTRAINT audit_log_pkey PRIMARY KEY (id)
+        )
+    """)
+    # DROP родительской таблицы удаляет и все ее секции
+    _finish_new_table("audit_log_partitioned", '"timestamp"')
+    op.create_index('ix_audit_log_id', 'audit_log', ['id'], unique=False)
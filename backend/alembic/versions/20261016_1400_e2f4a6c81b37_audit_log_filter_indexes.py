@@ -0,0 +1,58 @@
+"""Audit log filter indexes
+
+Revision ID: e2f4a6c81b37
+Revises: 5b0c8f2e7d14
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f4a6c81b37'
+down_revision = '5b0c8f2e7d14'
+branch_labels = None
+depends_on = None
+
+
+# имя индекса -> (суффикс индекса секции, определение)
+INDEXES = {
+    "ix_audit_log_operation_timestamp": ("operation_timestamp_idx", '(operation, "timestamp")'),
+    "ix_audit_log_user_id_timestamp": ("user_id_timestamp_idx", '(user_id, "timestamp")'),
+    "ix_audit_log_ip_address_timestamp": ("ip_address_timestamp_idx", '(ip_address, "timestamp")'),
+    "ix_audit_log_role_timestamp": ("role_timestamp_idx", '(role, "timestamp")'),
+    "ix_audit_log_username_trgm": ("username_trgm_idx", "USING gin (username gin_trgm_ops)"),
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    partitions = [
+        row[0] for row in op.get_bind().execute(sa.text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'audit_log'::regclass ORDER BY c.relname"
+        ))
+    ]
+
+    # CREATE INDEX CONCURRENTLY не поддерживается для секционированной таблицы:
+    # индекс создается ON ONLY на родителе (невалидным), затем CONCURRENTLY
+    # на каждой секции и присоединяется; после присоединения всех секций
+    # индекс родителя становится валидным, новые секции получают его автоматически
+    with op.get_context().autocommit_block():
+        for name, (suffix, definition) in INDEXES.items():
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY audit_log {definition}")
+            for partition in partitions:
+                partition_index = f"{partition}_{suffix}"
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index} ON {partition} {definition}")
+                op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
+
+        # Покрывается составным (operation, timestamp)
+        op.execute("DROP INDEX IF EXISTS ix_audit_log_operation")
+
+
+def downgrade() -> None:
+    op.create_index('ix_audit_log_operation', 'audit_log', ['operation'], unique=False)
+    for name in reversed(list(INDEXES)):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
@@ -0,0 +1,31 @@
+"""Product view stats
+
+Revision ID: 9c1d5e7a3f20
+Revises: e2f4a6c81b37
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1d5e7a3f20'
+down_revision = 'e2f4a6c81b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('product_view_stats',
+    sa.Column('minute', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('ip_bucket', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('minute', 'product_id', 'category', 'ip_bucket')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('product_view_stats')
@@ -0,0 +1,112 @@
+"""Products
+
+Revision ID: b6e2c9d4a1f8
+Revises: 3e8b1d4f6a92
+Create Date: 2026-10-16 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e2c9d4a1f8'
+down_revision = '3e8b1d4f6a92'
+branch_labels = None
+depends_on = None
+
+
+# Товары, ранее захардкоженные в app.api.products (MOCK_PRODUCTS)
+SEED_PRODUCTS = [
+    {
+        "id": 1,
+        "name": "Очки Ray-Ban Aviator",
+        "description": "Классические солнцезащитные очки",
+        "price": 12999.00,
+        "category": "Солнцезащитные",
+        "image_url": "https://example.com/rayban-aviator.jpg",
+        "in_stock": True,
+    },
+    {
+        "id": 2,
+        "name": "Очки для чтения +2.5",
+        "description": "Оправа металлическая, линзы антибликовые",
+        "price": 1999.00,
+        "category": "Для чтения",
+        "image_url": "https://example.com/reading-glasses.jpg",
+        "in_stock": True,
+    },
+    {
+        "id": 3,
+        "name": "Спортивные очки Oakley",
+        "description": "Для активного отдыха и спорта",
+        "price": 15999.00,
+        "category": "Спортивные",
+        "image_url": "https://example.com/oakley-sport.jpg",
+        "in_stock": True,
+    },
+    {
+        "id": 4,
+        "name": "Компьютерные очки с фильтром",
+        "description": "Защита от синего света компьютера",
+        "price": 3499.00,
+        "category": "Компьютерные",
+        "image_url": "https://example.com/computer-glasses.jpg",
+        "in_stock": True,
+    },
+    {
+        "id": 5,
+        "name": "Детские очки Disney",
+        "description": "Яркие оправы для детей 6-12 лет",
+        "price": 2999.00,
+        "category": "Детские",
+        "image_url": "https://example.com/disney-kids.jpg",
+        "in_stock": False,
+    },
+]
+
+
+def upgrade() -> None:
+    products = op.create_table('products',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('image_url', sa.String(length=500), nullable=True),
+    sa.Column('in_stock', sa.Boolean(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), server_default=sa.text('true'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_products_id'), 'products', ['id'], unique=False)
+    op.create_index(op.f('ix_products_category'), 'products', ['category'], unique=False)
+    op.create_index(op.f('ix_products_updated_at'), 'products', ['updated_at'], unique=False)
+
+    # updated_at - водяной знак инкрементального обновления каталога в воркерах,
+    # поэтому обновляется триггером при любом UPDATE (в т.ч. мимо ORM)
+    op.execute("""
+        CREATE FUNCTION products_touch_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER products_touch_updated_at BEFORE UPDATE ON products
+        FOR EACH ROW EXECUTE FUNCTION products_touch_updated_at()
+    """)
+
+    op.bulk_insert(products, SEED_PRODUCTS)
+    op.execute("SELECT setval('products_id_seq', coalesce((SELECT max(id) FROM products), 0) + 1, false)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS products_touch_updated_at ON products")
+    op.execute("DROP FUNCTION IF EXISTS products_touch_updated_at()")
+    op.drop_index(op.f('ix_products_updated_at'), table_name='products')
+    op.drop_index(op.f('ix_products_category'), table_name='products')
+    op.drop_index(op.f('ix_products_id'), table_name='products')
+    op.drop_table('products')
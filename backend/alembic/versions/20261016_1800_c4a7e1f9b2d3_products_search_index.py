@@ -0,0 +1,27 @@
+"""Products full-text search index
+
+Revision ID: c4a7e1f9b2d3
+Revises: b6e2c9d4a1f8
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a7e1f9b2d3'
+down_revision = 'b6e2c9d4a1f8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Для SEARCH_BACKEND=postgres; выражение совпадает с app.core.search.SEARCH_VECTOR_SQL
+    op.execute("""
+        CREATE INDEX ix_products_search ON products
+        USING gin (to_tsvector('russian', name || ' ' || category || ' ' || description))
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_products_search")
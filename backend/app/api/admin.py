@@ -8,8 +8,9 @@ from typing import List
 from app.db.database import get_db
 from app.db.models.user import User, UserRole
 from app.db.models.audit_log import OperationType, StatusType
-from app.auth.dependencies import require_admin, require_staff, get_current_user
-from app.core.security import hash_password, validate_password_strength
+from app.auth.dependencies import require_admin, require_staff
+from app.auth.principal import Principal, invalidate_principal
+from app.core.security import hash_password_async, validate_password_strength
 from app.api.schemas import (
     UserResponse,
     UserCreate,
@@ -24,7 +25,7 @@ router = APIRouter(prefix="/admin/users", tags=["Admin - Users"])
 
 @router.get("", response_model=List[UserResponse])
 async def get_users(
-    current_user: User = Depends(require_staff),
+    current_user: Principal = Depends(require_staff),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -39,7 +40,7 @@ async def get_users(
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    current_user: User = Depends(require_staff),
+    current_user: Principal = Depends(require_staff),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -61,7 +62,7 @@ async def get_user(
 async def create_user(
     user_data: UserCreate,
     request: Request,
-    current_user: User = Depends(require_admin),
+    current_user: Principal = Depends(require_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -91,7 +92,7 @@ async def create_user(
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        password_hash=hash_password(user_data.password),
+        password_hash=await hash_password_async(user_data.password),
         role=user_data.role
     )
     
@@ -121,7 +122,7 @@ async def update_user(
     user_id: int,
     user_data: UserUpdate,
     request: Request,
-    current_user: User = Depends(require_admin),
+    current_user: Principal = Depends(require_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -196,6 +197,7 @@ async def update_user(
     
     await db.commit()
     await db.refresh(user)
+    await invalidate_principal(user.id)
     
     # Общее логирование обновления
     if update_details:
@@ -218,7 +220,7 @@ async def update_user_role(
     user_id: int,
     role_data: UserRoleUpdate,
     request: Request,
-    current_user: User = Depends(require_admin),
+    current_user: Principal = Depends(require_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -239,6 +241,7 @@ async def update_user_role(
     
     await db.commit()
     await db.refresh(user)
+    await invalidate_principal(user.id)
     
     # Логирование
     await log_audit_event(
@@ -259,7 +262,7 @@ async def update_user_role(
 async def delete_user(
     user_id: int,
     request: Request,
-    current_user: User = Depends(require_admin),
+    current_user: Principal = Depends(require_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -286,6 +289,7 @@ async def delete_user(
     # Удаление
     await db.execute(delete(User).where(User.id == user_id))
     await db.commit()
+    await invalidate_principal(user_id)
     
     # Логирование
     await log_audit_event(
@@ -306,7 +310,7 @@ async def delete_user(
 async def reset_2fa(
     user_id: int,
     request: Request,
-    current_user: User = Depends(require_admin),
+    current_user: Principal = Depends(require_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -332,6 +336,7 @@ async def reset_2fa(
     user.secret_2fa = None
     
     await db.commit()
+    await invalidate_principal(user.id)
     
     # Логирование
     await log_audit_event(
@@ -9,8 +9,8 @@ from app.db.database import get_db
 from app.db.models.user import User
 from app.db.models.audit_log import OperationType, StatusType
 from app.core.security import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
     validate_password_strength,
     create_access_token,
     create_refresh_token,
@@ -18,7 +18,13 @@ from app.core.security import (
     generate_session_token
 )
 from app.auth.totp import verify_totp
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import (
+    get_current_principal,
+    limit_login_attempts,
+    limit_email_verification,
+    reset_rate_limit
+)
+from app.auth.principal import Principal, invalidate_principal
 from app.api.schemas import UserRegister, UserLogin, UserResponse, Message, TokenRefresh
 from app.middleware.logging import log_audit_event, get_client_ip
 from app.core.email import generate_verification_code, get_verification_expiry, send_verification_email
@@ -68,7 +74,7 @@ async def register(
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        password_hash=hash_password(user_data.password),
+        password_hash=await hash_password_async(user_data.password),
         email_verification_code=verification_code,
         email_verification_expires=get_verification_expiry(),
         email_verified=False  # Требует подтверждения
@@ -102,7 +108,7 @@ async def register(
     return new_user
 
 
-@router.post("/verify-email", response_model=Message)
+@router.post("/verify-email", response_model=Message, dependencies=[Depends(limit_email_verification)])
 async def verify_email(
     username: str = Query(..., description="Имя пользователя"),
     code: str = Query(..., description="Код подтверждения"),
@@ -148,6 +154,7 @@ async def verify_email(
     user.email_verification_code = None
     user.email_verification_expires = None
     await db.commit()
+    await reset_rate_limit("verify_email", username)
     
     return Message(message="Email успешно подтвержден! Теперь вы можете войти в систему.")
 
@@ -188,7 +195,7 @@ async def resend_verification(
     return Message(message="Новый код подтверждения отправлен на ваш email")
 
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(limit_login_attempts)])
 async def login(
     credentials: UserLogin,
     response: Response,
@@ -202,7 +209,7 @@ async def login(
     result = await db.execute(select(User).where(User.username == credentials.username))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if not user or not await verify_password_async(credentials.password, user.password_hash):
         await log_audit_event(
             db=db,
             operation=OperationType.LOGIN_FAILED,
@@ -298,6 +305,8 @@ async def login(
     # Обновление времени последнего входа
     user.last_login = datetime.now(timezone.utc)
     await db.commit()
+    await invalidate_principal(user.id)
+    await reset_rate_limit("login", credentials.username)
     
     # Логирование успешного входа
     await log_audit_event(
@@ -312,7 +321,7 @@ async def login(
     # Логирование для отладки
     import logging
     logger = logging.getLogger(__name__)
-    logger.info(f"[LOGIN] Tokens created - access: {len(access_token)} chars, refresh: {len(refresh_token)} chars")
+    logger.info("[LOGIN] Tokens created - access: %d chars, refresh: %d chars", len(access_token), len(refresh_token))
     
     # Возвращаем токены в JSON ответе (без cookies)
     response_data = {
@@ -323,7 +332,7 @@ async def login(
         "token_type": "bearer"
     }
     
-    logger.info(f"[LOGIN] Response prepared, has access_token: {bool(access_token)}, has refresh_token: {bool(refresh_token)}")
+    logger.info("[LOGIN] Response prepared, has access_token: %s, has refresh_token: %s", bool(access_token), bool(refresh_token))
     
     return response_data
 
@@ -331,7 +340,7 @@ async def login(
 @router.post("/logout")
 async def logout(
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -408,10 +417,11 @@ async def refresh_token(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Получение информации о текущем пользователе
+    При попадании в кэш principal отвечает без обращения к БД
     """
     return current_user
 
@@ -12,6 +12,7 @@ from app.db.models.user import User, UserRole
 from app.db.models.audit_log import OperationType, StatusType
 from app.core.security import generate_session_token, create_access_token, create_refresh_token
 from app.middleware.logging import log_audit_event, get_client_ip
+from app.auth.principal import invalidate_principal
 from datetime import datetime, timezone
 import secrets
 import os
@@ -120,6 +121,7 @@ async def google_callback(
         )
         
         await db.commit()
+        await invalidate_principal(user.id)
         
         # Создание JWT токенов
         token_data = {
@@ -2,49 +2,51 @@
 API endpoints для просмотра логов аудита
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_
-from typing import Optional
-from datetime import datetime
-from app.db.database import get_db
-from app.db.models.user import User
+from sqlalchemy import select, func, and_, or_, tuple_
+from sqlalchemy.orm import aliased
+from typing import Any, Optional, Tuple
+from datetime import datetime, timezone
+import base64
+import csv
+import enum
+import io
+import json
+import zlib
+from app.core.config import settings
+from app.db.database import get_db, AsyncSessionLocal
 from app.db.models.audit_log import AuditLog, OperationType, StatusType
-from app.auth.dependencies import require_staff, get_current_user
+from app.auth.dependencies import require_staff
+from app.auth.principal import Principal
 from app.api.schemas import AuditLogResponse, AuditLogListResponse
 from app.middleware.logging import log_audit_event, get_client_ip
+from app.core.audit_writer import audit_writer
+from app.db.counting import cached_or_estimated_count, exact_count, remember_count
+from app.db.audit_rollups import summarize
 
 router = APIRouter(prefix="/admin/logs", tags=["Admin - Logs"])
 
 
-@router.get("", response_model=AuditLogListResponse)
-async def get_logs(
-    request: Request,
-    page: int = Query(1, ge=1, description="Номер страницы"),
-    limit: int = Query(50, ge=1, le=200, description="Количество записей на странице"),
-    from_date: Optional[str] = Query(None, description="Дата начала фильтра (YYYY-MM-DD)"),
-    to_date: Optional[str] = Query(None, description="Дата окончания фильтра (YYYY-MM-DD)"),
-    role: Optional[str] = Query(None, description="Фильтр по роли"),
-    operation: Optional[OperationType] = Query(None, description="Фильтр по типу операции"),
-    status: Optional[StatusType] = Query(None, description="Фильтр по статусу"),
-    username: Optional[str] = Query(None, description="Фильтр по имени пользователя"),
-    ip_address: Optional[str] = Query(None, description="Фильтр по IP адресу"),
-    sort_by: str = Query("timestamp", regex="^(timestamp|username|role|operation|status)$"),
-    sort_order: str = Query("desc", regex="^(asc|desc)$"),
-    current_user: User = Depends(require_staff),
-    db: AsyncSession = Depends(get_db)
-):
+def build_log_filters(
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    role: Optional[str] = None,
+    operation: Optional[OperationType] = None,
+    status: Optional[StatusType] = None,
+    username: Optional[str] = None,
+    ip_address: Optional[str] = None,
+) -> list:
     """
-    Получение логов с фильтрацией, сортировкой и пагинацией
-    Доступно для admin и staff
+    Построение списка условий WHERE по фильтрам журнала
     """
-    # Построение запроса с фильтрами
-    query = select(AuditLog)
     filters = []
     
     # Парсинг дат из строк
     if from_date:
         try:
-            from_date_dt = datetime.strptime(from_date, "%Y-%m-%d")
+            # Даты в UTC - совпадают с границами помесячных секций
+            from_date_dt = datetime.strptime(from_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
             filters.append(AuditLog.timestamp >= from_date_dt)
         except ValueError:
             pass  # Игнорируем неверный формат
@@ -53,7 +55,7 @@ async def get_logs(
         try:
             # Добавляем 23:59:59 чтобы включить весь день
             to_date_dt = datetime.strptime(to_date, "%Y-%m-%d")
-            to_date_dt = to_date_dt.replace(hour=23, minute=59, second=59)
+            to_date_dt = to_date_dt.replace(hour=23, minute=59, second=59, tzinfo=timezone.utc)
             filters.append(AuditLog.timestamp <= to_date_dt)
         except ValueError:
             pass  # Игнорируем неверный формат
@@ -73,31 +75,182 @@ async def get_logs(
     if ip_address:
         filters.append(AuditLog.ip_address == ip_address)
     
-    if filters:
-        query = query.where(and_(*filters))
+    return filters
+
+
+# ============= Keyset (cursor) пагинация =============
+#
+# Курсор - непрозрачная base64-строка с ключом (значение sort_by, id)
+# граничной записи и направлением перехода. NULL считается наибольшим
+# значением, что совпадает с порядком PostgreSQL по умолчанию
+# (ASC NULLS LAST / DESC NULLS FIRST), поэтому используются обычные индексы.
+
+def _encode_sort_value(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _decode_sort_value(sort_by: str, value):
+    if value is None:
+        return None
+    if sort_by == "timestamp":
+        return datetime.fromisoformat(value)
+    if sort_by == "operation":
+        return OperationType(value)
+    if sort_by == "status":
+        return StatusType(value)
+    return str(value)
+
+
+def encode_cursor(log: AuditLog, sort_by: str, sort_order: str, direction: str) -> str:
+    """Кодирование курсора для записи log"""
+    data = {
+        "s": sort_by,
+        "o": sort_order,
+        "d": direction,
+        "v": _encode_sort_value(getattr(log, sort_by)),
+        "id": log.id,
+    }
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> Tuple[str, Any, int]:
+    """
+    Декодирование курсора
+    Возвращает (направление, значение sort_by, id)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        if data["s"] != sort_by or data["o"] != sort_order or data["d"] not in ("next", "prev"):
+            raise ValueError("cursor does not match sorting")
+        return data["d"], _decode_sort_value(sort_by, data["v"]), int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Недействительный курсор"
+        )
+
+
+def keyset_condition(sort_column, value, last_id: int, descending: bool, id_column=AuditLog.id):
+    """Условие "после (value, last_id)" в заданном направлении обхода"""
+    if descending:
+        if value is None:
+            return or_(sort_column.isnot(None), and_(sort_column.is_(None), id_column < last_id))
+        return tuple_(sort_column, id_column) < (value, last_id)
     
-    # Подсчет общего количества
-    count_query = select(func.count()).select_from(AuditLog)
-    if filters:
-        count_query = count_query.where(and_(*filters))
+    if value is None:
+        return and_(sort_column.is_(None), id_column > last_id)
+    return or_(tuple_(sort_column, id_column) > (value, last_id), sort_column.is_(None))
+
+
+@router.get("", response_model=AuditLogListResponse)
+async def get_logs(
+    request: Request,
+    page: int = Query(1, ge=1, description="Номер страницы"),
+    limit: int = Query(50, ge=1, le=200, description="Количество записей на странице"),
+    cursor: Optional[str] = Query(None, description="Курсор (next_cursor/prev_cursor из предыдущего ответа); при наличии page игнорируется"),
+    from_date: Optional[str] = Query(None, description="Дата начала фильтра (YYYY-MM-DD)"),
+    to_date: Optional[str] = Query(None, description="Дата окончания фильтра (YYYY-MM-DD)"),
+    role: Optional[str] = Query(None, description="Фильтр по роли"),
+    operation: Optional[OperationType] = Query(None, description="Фильтр по типу операции"),
+    status: Optional[StatusType] = Query(None, description="Фильтр по статусу"),
+    username: Optional[str] = Query(None, description="Фильтр по имени пользователя"),
+    ip_address: Optional[str] = Query(None, description="Фильтр по IP адресу"),
+    sort_by: str = Query("timestamp", regex="^(timestamp|username|role|operation|status)$"),
+    sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    current_user: Principal = Depends(require_staff),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Получение логов с фильтрацией, сортировкой и пагинацией
+    Доступно для admin и staff
+    
+    Поддерживаются два режима пагинации:
+    - page: OFFSET, удобно для первых страниц
+    - cursor: keyset по (sort_by, id), стоимость не зависит от глубины
+    """
+    filters = build_log_filters(
+        from_date=from_date,
+        to_date=to_date,
+        role=role,
+        operation=operation,
+        status=status,
+        username=username,
+        ip_address=ip_address,
+    )
+    
+    # Общее количество в той же сессии: кэш, иначе оценка планировщика
+    cache_key = ("audit_log", from_date, to_date, role, operation, status, username, ip_address)
+    counted = await cached_or_estimated_count(db, AuditLog, filters, cache_key=cache_key)
+    
+    # Построение запроса с фильтрами
+    if counted is None:
+        # Оценка мала - точное количество окном в том же запросе страницы.
+        # Фильтры во внутреннем запросе, курсор и пагинация снаружи, чтобы
+        # окно считало все подходящие записи, а не только после курсора
+        windowed = select(AuditLog, func.count().over().label("total_rows"))
+        if filters:
+            windowed = windowed.where(and_(*filters))
+        windowed = windowed.subquery()
+        entry = aliased(AuditLog, windowed)
+        query = select(entry, windowed.c.total_rows)
+    else:
+        entry = AuditLog
+        query = select(AuditLog)
+        if filters:
+            query = query.where(and_(*filters))
+    
+    # Сортировка (id - уникальный второй ключ для стабильного порядка)
+    sort_column = getattr(entry, sort_by)
+    descending = sort_order == "desc"
+    direction = "next"
     
-    result = await db.execute(count_query)
-    total = result.scalar()
+    if cursor:
+        direction, cursor_value, cursor_id = decode_cursor(cursor, sort_by, sort_order)
+        # Для перехода назад обходим в обратном порядке и разворачиваем результат
+        scan_descending = descending if direction == "next" else not descending
+        query = query.where(keyset_condition(sort_column, cursor_value, cursor_id, scan_descending, entry.id))
+    else:
+        scan_descending = descending
     
-    # Сортировка
-    sort_column = getattr(AuditLog, sort_by)
-    if sort_order == "desc":
-        query = query.order_by(sort_column.desc())
+    if scan_descending:
+        query = query.order_by(sort_column.desc(), entry.id.desc())
     else:
-        query = query.order_by(sort_column.asc())
+        query = query.order_by(sort_column.asc(), entry.id.asc())
     
-    # Пагинация
-    offset = (page - 1) * limit
-    query = query.offset(offset).limit(limit)
+    # Пагинация (лишняя запись показывает, есть ли следующая страница)
+    if not cursor:
+        query = query.offset((page - 1) * limit)
+    query = query.limit(limit + 1)
     
-    # Выполнение запроса
     result = await db.execute(query)
-    logs = result.scalars().all()
+    if counted is None:
+        rows = result.all()
+        logs = [row[0] for row in rows]
+        # Пустая страница (OFFSET за концом, курсор у края) окна не несет
+        total = rows[0].total_rows if rows else await exact_count(db, AuditLog, filters)
+        counted = remember_count(cache_key, total)
+    else:
+        logs = list(result.scalars().all())
+    total, is_estimate = counted
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+    
+    if direction == "prev":
+        logs.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, bool(cursor) or page > 1
+    
+    next_cursor = encode_cursor(logs[-1], sort_by, sort_order, "next") if logs and has_next else None
+    prev_cursor = encode_cursor(logs[0], sort_by, sort_order, "prev") if logs and has_prev else None
     
     # Логирование просмотра логов
     await log_audit_event(
@@ -106,21 +259,152 @@ async def get_logs(
         status=StatusType.SUCCESS,
         user=current_user,
         ip_address=get_client_ip(request),
-        details=f"Просмотр логов: страница {page}, фильтры: role={role}, operation={operation}, status={status}"
+        details=f"Просмотр логов: {'курсор' if cursor else f'страница {page}'}, фильтры: role={role}, operation={operation}, status={status}"
     )
     
     return AuditLogListResponse(
         total=total,
+        is_estimate=is_estimate,
         page=page,
         limit=limit,
-        logs=[AuditLogResponse.model_validate(log) for log in logs]
+        logs=[AuditLogResponse.model_validate(log) for log in logs],
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor
+    )
+
+
+# ============= Экспорт =============
+
+EXPORT_COLUMNS = [column.name for column in AuditLog.__table__.columns]
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+async def _stream_log_rows(filters: list, descending: bool):
+    """
+    Чтение строк журнала серверным курсором пакетами по EXPORT_CHUNK_ROWS
+    Используются Core-строки (без ORM объектов) и отдельная сессия,
+    живущая столько же, сколько поток ответа
+    """
+    query = select(*AuditLog.__table__.columns)
+    if filters:
+        query = query.where(and_(*filters))
+    if descending:
+        query = query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
+    else:
+        query = query.order_by(AuditLog.timestamp.asc(), AuditLog.id.asc())
+    query = query.execution_options(yield_per=settings.EXPORT_CHUNK_ROWS)
+
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+
+def _encode_ndjson(rows) -> str:
+    return "".join(
+        json.dumps({name: _export_value(value) for name, value in zip(EXPORT_COLUMNS, row)}, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def _encode_csv(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows([_export_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def _export_body(filters: list, descending: bool, fmt: str, compress: bool):
+    """Генератор тела ответа: строки -> NDJSON/CSV -> (gzip) -> байты"""
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 - формат gzip
+    first = True
+
+    async for rows in _stream_log_rows(filters, descending):
+        if fmt == "csv":
+            text = _encode_csv(rows, header=first)
+        else:
+            text = _encode_ndjson(rows)
+        data = text.encode("utf-8")
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+        first = False
+
+    if fmt == "csv" and first:
+        # Пустой результат - только заголовок
+        data = _encode_csv([], header=True).encode("utf-8")
+        yield compressor.compress(data) if compressor is not None else data
+    if compressor is not None:
+        yield compressor.flush()
+
+
+@router.get("/export")
+async def export_logs(
+    request: Request,
+    export_format: str = Query("ndjson", alias="format", regex="^(ndjson|csv)$", description="Формат: ndjson или csv"),
+    compress: bool = Query(False, alias="gzip", description="Сжатие gzip на лету"),
+    from_date: Optional[str] = Query(None, description="Дата начала фильтра (YYYY-MM-DD)"),
+    to_date: Optional[str] = Query(None, description="Дата окончания фильтра (YYYY-MM-DD)"),
+    role: Optional[str] = Query(None, description="Фильтр по роли"),
+    operation: Optional[OperationType] = Query(None, description="Фильтр по типу операции"),
+    status: Optional[StatusType] = Query(None, description="Фильтр по статусу"),
+    username: Optional[str] = Query(None, description="Фильтр по имени пользователя"),
+    ip_address: Optional[str] = Query(None, description="Фильтр по IP адресу"),
+    sort_order: str = Query("asc", regex="^(asc|desc)$", description="Порядок по времени"),
+    current_user: Principal = Depends(require_staff),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Потоковый экспорт журнала (NDJSON/CSV, опционально gzip)
+    Фильтры те же, что у списка логов; память не зависит от объема выгрузки
+    """
+    filters = build_log_filters(
+        from_date=from_date,
+        to_date=to_date,
+        role=role,
+        operation=operation,
+        status=status,
+        username=username,
+        ip_address=ip_address,
+    )
+    
+    await log_audit_event(
+        db=db,
+        operation=OperationType.LOGS_VIEWED,
+        status=StatusType.SUCCESS,
+        user=current_user,
+        ip_address=get_client_ip(request),
+        details=f"Экспорт логов ({export_format}{', gzip' if compress else ''}), фильтры: from={from_date}, to={to_date}, role={role}, operation={operation}, status={status}"
+    )
+    
+    filename = f"audit_log_{datetime.now(timezone.utc):%Y%m%d_%H%M%S}.{export_format}"
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    else:
+        media_type = "text/csv; charset=utf-8" if export_format == "csv" else "application/x-ndjson"
+    
+    return StreamingResponse(
+        _export_body(filters, sort_order == "desc", export_format, compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
 
 @router.get("/{log_id}", response_model=AuditLogResponse)
 async def get_log_detail(
     log_id: int,
-    current_user: User = Depends(require_staff),
+    current_user: Principal = Depends(require_staff),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -142,68 +426,23 @@ async def get_log_detail(
 async def get_logs_summary(
     from_date: Optional[datetime] = Query(None),
     to_date: Optional[datetime] = Query(None),
-    current_user: User = Depends(require_staff),
+    current_user: Principal = Depends(require_staff),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Получение статистики по логам
-    """
-    filters = []
-    
-    if from_date:
-        filters.append(AuditLog.timestamp >= from_date)
-    
-    if to_date:
-        filters.append(AuditLog.timestamp <= to_date)
-    
-    # Общее количество событий
-    total_query = select(func.count()).select_from(AuditLog)
-    if filters:
-        total_query = total_query.where(and_(*filters))
-    
-    result = await db.execute(total_query)
-    total_events = result.scalar()
     
-    # По статусам
-    status_query = select(
-        AuditLog.status,
-        func.count(AuditLog.id).label("count")
-    ).group_by(AuditLog.status)
-    
-    if filters:
-        status_query = status_query.where(and_(*filters))
-    
-    result = await db.execute(status_query)
-    by_status = {row.status.value: row.count for row in result}
-    
-    # По типам операций (топ 10)
-    operation_query = select(
-        AuditLog.operation,
-        func.count(AuditLog.id).label("count")
-    ).group_by(AuditLog.operation).order_by(func.count(AuditLog.id).desc()).limit(10)
-    
-    if filters:
-        operation_query = operation_query.where(and_(*filters))
-    
-    result = await db.execute(operation_query)
-    by_operation = {row.operation.value: row.count for row in result}
-    
-    # По пользователям (топ 10)
-    user_query = select(
-        AuditLog.username,
-        func.count(AuditLog.id).label("count")
-    ).where(AuditLog.username.isnot(None)).group_by(AuditLog.username).order_by(func.count(AuditLog.id).desc()).limit(10)
-    
-    if filters:
-        user_query = user_query.where(and_(*filters))
-    
-    result = await db.execute(user_query)
-    by_user = {row.username: row.count for row in result}
-    
-    return {
-        "total_events": total_events,
-        "by_status": by_status,
-        "top_operations": by_operation,
-        "top_users": by_user
-    }
+    Считается по почасовым/посуточным агрегатам; сырая таблица читается
+    только для неполных часов на границах периода
+    """
+    return await summarize(db, from_date=from_date, to_date=to_date)
 
+
+@router.get("/stats/writer")
+async def get_audit_writer_stats(
+    current_user: Principal = Depends(require_staff)
+):
+    """
+    Состояние фоновой записи журнала: глубина очереди, размер пакетов, время записи
+    """
+    return audit_writer.stats()
@@ -0,0 +1,141 @@
+"""
+API endpoint метрик в текстовом формате Prometheus
+"""
+import secrets
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from app.core.config import settings
+from app.core.audit_writer import audit_writer
+from app.core.catalog import catalog
+from app.core.facets import catalog_responses, facet_index
+from app.core.search import search_index
+from app.core.loop_monitor import loop_monitor
+from app.core.metrics import PrometheusWriter, Histogram, merge_histograms, request_metrics, pool_wait
+from app.core.security import password_hasher
+from app.db.database import engine
+from app.auth.dependencies import security
+from app.api import auth, twofa, admin, logs, products, google_oauth, profiles
+
+router = APIRouter(tags=["Health"])
+
+# Роутеры приложения; маршрут относится к роутеру с самым длинным совпавшим префиксом
+ROUTERS = {
+    "auth": auth.router,
+    "2fa": twofa.router,
+    "admin": admin.router,
+    "logs": logs.router,
+    "products": products.router,
+    "google_oauth": google_oauth.router,
+    "profiles": profiles.router,
+}
+_PREFIXES = sorted(((r.prefix, name) for name, r in ROUTERS.items()), key=lambda item: -len(item[0]))
+
+
+def router_name(route: str) -> str:
+    for prefix, name in _PREFIXES:
+        if route == prefix or route.startswith(prefix + "/"):
+            return name
+    return "other"
+
+
+def check_metrics_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
+    """
+    /metrics требует Authorization: Bearer <METRICS_TOKEN>
+
+    Без токена метрики открыты только в DEBUG, иначе endpoint отключен
+    """
+    if not settings.METRICS_TOKEN:
+        if settings.DEBUG:
+            return
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Метрики отключены: не задан METRICS_TOKEN")
+    if not credentials or not secrets.compare_digest(credentials.credentials, settings.METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный токен метрик")
+
+
+def render_metrics() -> str:
+    writer = PrometheusWriter()
+
+    # Латентность и ответы по роутерам
+    by_router: Dict[str, List[Histogram]] = {}
+    for (method, route), histogram in request_metrics.latency.items():
+        by_router.setdefault(router_name(route), []).append(histogram)
+    writer.histogram(
+        "http_request_duration_seconds",
+        "Request latency by router",
+        [({"router": name}, merge_histograms(histograms)) for name, histograms in sorted(by_router.items())],
+    )
+
+    responses: Dict[tuple, int] = {}
+    for (method, route, code), count in request_metrics.responses.items():
+        key = (router_name(route), str(code))
+        responses[key] = responses.get(key, 0) + count
+    writer.metric(
+        "http_responses_total", "counter", "Responses by router and status code",
+        [({"router": name, "status": code}, count) for (name, code), count in sorted(responses.items())],
+    )
+
+    cpu: Dict[str, float] = {}
+    for (method, route), seconds in request_metrics.cpu_seconds.items():
+        cpu[router_name(route)] = cpu.get(router_name(route), 0.0) + seconds
+    writer.metric(
+        "http_request_cpu_seconds_total", "counter", "Worker thread CPU time spent while serving requests",
+        [({"router": name}, seconds) for name, seconds in sorted(cpu.items())],
+    )
+
+    # Пул соединений SQLAlchemy
+    pool = engine.pool
+    writer.metric("db_pool_size", "gauge", "Configured pool size", [(None, pool.size())])
+    writer.metric("db_pool_checked_out", "gauge", "Connections currently checked out", [(None, pool.checkedout())])
+    writer.metric("db_pool_checked_in", "gauge", "Idle connections in the pool", [(None, pool.checkedin())])
+    writer.metric("db_pool_overflow", "gauge", "Connections above pool_size (negative - unused capacity)", [(None, pool.overflow())])
+    writer.histogram("db_pool_checkout_wait_seconds", "Time to obtain a connection from the pool", [(None, pool_wait)])
+
+    # Журнал аудита
+    audit = audit_writer.stats()
+    writer.metric("audit_events_enqueued_total", "counter", "Audit events queued for writing", [(None, audit["enqueued"])])
+    writer.metric("audit_events_written_total", "counter", "Audit events written to the database", [(None, audit["written"])])
+    writer.metric("audit_events_failed_total", "counter", "Audit events lost on write errors", [(None, audit["failed"])])
+    writer.metric("audit_queue_depth", "gauge", "Audit events waiting in the queue", [(None, audit["queue_depth"])])
+
+    # Каталог в памяти
+    catalog_stats = catalog.stats()
+    writer.metric("catalog_products", "gauge", "Products in the worker's in-memory catalog", [(None, catalog_stats["products"])])
+    writer.metric("catalog_refreshes_total", "counter", "Incremental catalog refreshes", [(None, catalog_stats["refreshes"])])
+    writer.metric("catalog_refresh_failures_total", "counter", "Failed catalog refreshes", [(None, catalog_stats["failed_refreshes"])])
+    responses_stats = catalog_responses.stats()
+    writer.metric("catalog_response_cache_hits_total", "counter", "Catalog listings served from pre-encoded bytes", [(None, responses_stats["hits"])])
+    writer.metric("catalog_response_cache_misses_total", "counter", "Catalog listings encoded on demand", [(None, responses_stats["misses"])])
+    facet_stats = facet_index.stats()
+    writer.metric("facet_index_rebuilds_total", "counter", "Facet index snapshot rebuilds", [(None, facet_stats["rebuilds"])])
+    writer.metric("facet_index_rebuild_seconds", "gauge", "Duration of the last facet index rebuild", [(None, facet_stats["last_rebuild_ms"] / 1000)])
+    search_stats = search_index.stats()
+    writer.metric("search_queries_total", "counter", "Catalog search queries", [(None, search_stats["queries"])])
+    writer.metric("search_cache_hits_total", "counter", "Catalog search queries answered from the result cache", [(None, search_stats["cache_hits"])])
+    writer.metric("search_index_terms", "gauge", "Distinct terms in the in-memory search index", [(None, search_stats["terms"])])
+
+    # bcrypt
+    hashing = password_hasher.stats()
+    writer.metric("bcrypt_queue_depth", "gauge", "Password hash operations waiting for a thread", [(None, hashing["queue_depth"])])
+    writer.metric("bcrypt_in_flight", "gauge", "Password hash operations queued or running", [(None, hashing["in_flight"])])
+    writer.metric("bcrypt_completed_total", "counter", "Password hash operations completed", [(None, hashing["completed"])])
+    writer.metric("bcrypt_failed_total", "counter", "Password hash operations that raised", [(None, hashing["failed"])])
+    writer.metric("bcrypt_rejected_total", "counter", "Password hash operations rejected with 503", [(None, hashing["rejected"])])
+
+    # Event loop
+    writer.histogram("event_loop_lag_seconds", "Event loop wake-up delay", [(None, loop_monitor.lag)])
+    writer.metric(
+        "event_loop_lag_quantile_seconds", "gauge", "Event loop lag quantiles (bucket upper bounds)",
+        [({"quantile": str(q)}, loop_monitor.lag.quantile(q)) for q in (0.5, 0.9, 0.99)],
+    )
+    writer.metric("event_loop_stalls_total", "counter", "Event loop blocks longer than the threshold", [(None, loop_monitor.stalls)])
+
+    return writer.render()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(check_metrics_token)])
+async def metrics():
+    """Метрики воркера в формате Prometheus"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,21 +1,29 @@
 """
-API endpoints для каталога товаров (mock)
+API endpoints для каталога товаров
+
+Чтение идет из каталога в памяти воркера (app.core.catalog), без запросов к БД.
+Сессия БД (get_read_db) ленивая и без коммита: соединение из пула берется
+только для записи audit_log (режим audit) или поиска при SEARCH_BACKEND=postgres.
 """
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from app.db.database import get_db
-from app.db.models.user import User
+from typing import Callable, Dict, List, Optional, Tuple
+import json
+from app.db.database import get_read_db
 from app.db.models.audit_log import OperationType, StatusType
-from app.auth.dependencies import get_current_user
 from app.middleware.logging import log_audit_event, get_client_ip
+from app.core.config import settings
+from app.core.view_counter import view_counter
+from app.core.catalog import catalog, encode_items, normalize_category
+from app.core.search import search_index, search_postgres
+from app.core.facets import SORTS, catalog_responses, facet_index
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
 
 class Product(BaseModel):
-    """Mock модель товара"""
+    """Товар каталога (ответ API)"""
     id: int
     name: str
     description: str
@@ -25,127 +33,249 @@ class Product(BaseModel):
     in_stock: bool = True
 
 
-# Mock данные
-MOCK_PRODUCTS = [
-    Product(
-        id=1,
-        name="Очки Ray-Ban Aviator",
-        description="Классические солнцезащитные очки",
-        price=12999.00,
-        category="Солнцезащитные",
-        image_url="https://example.com/rayban-aviator.jpg",
-        in_stock=True
-    ),
-    Product(
-        id=2,
-        name="Очки для чтения +2.5",
-        description="Оправа металлическая, линзы антибликовые",
-        price=1999.00,
-        category="Для чтения",
-        image_url="https://example.com/reading-glasses.jpg",
-        in_stock=True
-    ),
-    Product(
-        id=3,
-        name="Спортивные очки Oakley",
-        description="Для активного отдыха и спорта",
-        price=15999.00,
-        category="Спортивные",
-        image_url="https://example.com/oakley-sport.jpg",
-        in_stock=True
-    ),
-    Product(
-        id=4,
-        name="Компьютерные очки с фильтром",
-        description="Защита от синего света компьютера",
-        price=3499.00,
-        category="Компьютерные",
-        image_url="https://example.com/computer-glasses.jpg",
-        in_stock=True
-    ),
-    Product(
-        id=5,
-        name="Детские очки Disney",
-        description="Яркие оправы для детей 6-12 лет",
-        price=2999.00,
-        category="Детские",
-        image_url="https://example.com/disney-kids.jpg",
-        in_stock=False
-    ),
-]
+SORT_PATTERN = "^(" + "|".join(SORTS) + ")$"
 
 
-@router.get("", response_model=List[Product])
-async def get_products(
+class FacetValue(BaseModel):
+    """Значение фасета и число товаров с ним"""
+    value: str
+    count: int
+
+
+class PriceBucket(BaseModel):
+    """Ценовой диапазон [min, max) фасета цены (None - без границы)"""
+    min: Optional[float] = None
+    max: Optional[float] = None
+    count: int
+
+
+class PriceRange(BaseModel):
+    min: float
+    max: float
+
+
+class ProductFacets(BaseModel):
+    """Счетчики с учетом остальных фильтров (кроме фильтра самого фасета)"""
+    category: List[FacetValue]
+    in_stock: Dict[str, int]
+    price: List[PriceBucket]
+    price_range: Optional[PriceRange] = None
+
+
+class ProductPage(BaseModel):
+    """Страница отфильтрованного каталога с фасетами"""
+    items: List[Product]
+    total: int
+    page: int
+    page_size: int
+    facets: ProductFacets
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match: список тегов или "*", сравнение слабое (RFC 9110)"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def catalog_response(request: Request, key: tuple, build: Callable[[], Tuple[bytes, int]]) -> Response:
+    """
+    Готовые JSON байты из кэша (на версию каталога) с ETag;
+    при совпадении If-None-Match - 304 без тела
+    """
+    headers = {"Cache-Control": f"public, max-age={settings.CATALOG_CACHE_MAX_AGE}"}
+    etag = catalog_responses.etag()
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        headers["ETag"] = etag
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    entry = catalog_responses.get_body(key, build)
+    headers["ETag"] = entry.etag
+    headers["X-Total-Count"] = str(entry.total)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def require_catalog():
+    """Каталог еще не загружен из БД (старт воркера при недоступной БД)"""
+    if not catalog.loaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Каталог временно недоступен"
+        )
+
+
+async def record_product_view(
     request: Request,
+    db: AsyncSession,
+    product_id: Optional[int] = None,
     category: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
+    details: Optional[str] = None
 ):
     """
-    Получение каталога товаров (mock данные)
-    Доступно без авторизации
+    Учет просмотра каталога
+    
+    По умолчанию (PRODUCT_VIEW_MODE=counters) просмотр увеличивает счетчик в памяти,
+    который периодически сбрасывается в product_view_stats. В режиме "audit"
+    (или если счетчик не запущен) пишется отдельное событие audit_log.
     """
-    products = MOCK_PRODUCTS
+    ip_address = get_client_ip(request)
     
-    # Фильтрация по категории
-    if category:
-        products = [p for p in products if p.category.lower() == category.lower()]
+    if settings.PRODUCT_VIEW_MODE == "counters" and view_counter.running:
+        view_counter.record(product_id=product_id, category=category, ip_address=ip_address)
+        return
     
-    # Логирование просмотра (без привязки к пользователю если не авторизован)
     try:
-        # Попытка получить текущего пользователя (если есть)
-        user = None
-        access_token = request.cookies.get("access_token")
-        if access_token:
-            # Можно добавить проверку токена, но для просмотра каталога не обязательно
-            pass
-        
         await log_audit_event(
             db=db,
             operation=OperationType.PRODUCT_VIEW,
             status=StatusType.SUCCESS,
-            user=user,
-            ip_address=get_client_ip(request),
-            details=f"Просмотр каталога товаров, категория: {category or 'все'}"
+            ip_address=ip_address,
+            target_table="products" if product_id else None,
+            target_id=product_id,
+            details=details
         )
     except Exception:
         # Игнорируем ошибки логирования для публичных страниц
         pass
+
+
+@router.get("", response_model=List[Product])
+async def get_products(
+    request: Request,
+    category: Optional[str] = None,
+    page: Optional[int] = Query(None, ge=1, description=f"Страница по {settings.CATALOG_PAGE_SIZE} товаров; без параметра - весь список"),
+    sort: str = Query("id", pattern=SORT_PATTERN),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Получение каталога товаров
+    Доступно без авторизации
+    
+    Ответ - готовые JSON байты из кэша (на версию каталога) с ETag;
+    при совпадении If-None-Match возвращается 304 без тела
+    """
+    require_catalog()
+    
+    # Учет просмотра (без привязки к пользователю если не авторизован)
+    await record_product_view(
+        request,
+        db,
+        category=category,
+        details=f"Просмотр каталога товаров, категория: {category or 'все'}"
+    )
+    
+    def build():
+        # Категория и порядок - из готовых индексов (app.core.facets)
+        offset, limit = 0, None
+        if page:
+            offset, limit = (page - 1) * settings.CATALOG_PAGE_SIZE, settings.CATALOG_PAGE_SIZE
+        result = facet_index.query(categories=[category] if category else (), sort=sort, offset=offset, limit=limit)
+        return encode_items(result.items), result.total
+    
+    return catalog_response(request, ("list", normalize_category(category), page or 0, sort), build)
+
+
+@router.get("/filter", response_model=ProductPage)
+async def filter_products(
+    request: Request,
+    category: List[str] = Query([], description="Одна или несколько категорий (OR)"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    sort: str = Query("id", pattern=SORT_PATTERN),
+    page: int = Query(1, ge=1),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Фильтрация каталога по категориям, цене (включительно) и наличию
+    В том же ответе - число товаров по каждому значению фасетов
+    Доступно без авторизации
+    """
+    require_catalog()
+    
+    categories = sorted({normalize_category(value) for value in category if value.strip()})
+    await record_product_view(
+        request,
+        db,
+        category=", ".join(categories) or None,
+        details=f"Фильтр каталога: категории {', '.join(categories) or 'все'}, цена {min_price}-{max_price}, в наличии {in_stock}"
+    )
+    
+    def build():
+        result = facet_index.query(
+            categories=categories,
+            min_price=min_price,
+            max_price=max_price,
+            in_stock=in_stock,
+            sort=sort,
+            offset=(page - 1) * settings.CATALOG_PAGE_SIZE,
+            limit=settings.CATALOG_PAGE_SIZE,
+        )
+        body = {
+            "items": [item.to_dict() for item in result.items],
+            "total": result.total,
+            "page": page,
+            "page_size": settings.CATALOG_PAGE_SIZE,
+            "facets": result.facets,
+        }
+        return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), result.total
     
-    return products
+    key = ("filter", tuple(categories), min_price, max_price, in_stock, sort, page)
+    return catalog_response(request, key, build)
+
+
+@router.get("/search", response_model=List[Product])
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=200, description="Запрос; последнее слово ищется и по префиксу"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Полнотекстовый поиск по названию, описанию и категории
+    Доступно без авторизации; результаты по убыванию релевантности
+    """
+    require_catalog()
+    
+    if settings.SEARCH_BACKEND == "postgres":
+        product_ids = await search_postgres(db, q, limit, offset)
+    else:
+        product_ids = [product_id for product_id, score in search_index.search(q, limit, offset)]
+    
+    products = [item for item in map(catalog.get, product_ids) if item is not None]
+    return Response(content=encode_items(products), media_type="application/json")
 
 
 @router.get("/{product_id}", response_model=Product)
 async def get_product(
     product_id: int,
     request: Request,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Получение информации о конкретном товаре
     """
-    product = next((p for p in MOCK_PRODUCTS if p.id == product_id), None)
+    require_catalog()
+    product = catalog.get(product_id)
     
     if not product:
-        from fastapi import HTTPException, status
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Товар не найден"
         )
     
-    # Логирование просмотра товара
-    try:
-        await log_audit_event(
-            db=db,
-            operation=OperationType.PRODUCT_VIEW,
-            status=StatusType.SUCCESS,
-            ip_address=get_client_ip(request),
-            target_table="products",
-            target_id=product_id,
-            details=f"Просмотр товара: {product.name}"
-        )
-    except Exception:
-        pass
+    # Учет просмотра товара
+    await record_product_view(
+        request,
+        db,
+        product_id=product_id,
+        category=product.category,
+        details=f"Просмотр товара: {product.name}"
+    )
     
     return product
 
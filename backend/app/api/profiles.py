@@ -0,0 +1,43 @@
+"""
+API endpoints для просмотра профилей запросов (только для администраторов)
+"""
+import asyncio
+from typing import List, Dict, Any
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from app.auth.dependencies import require_admin
+from app.auth.principal import Principal
+from app.core.profiling import profile_store
+
+router = APIRouter(prefix="/admin/profiles", tags=["Admin - Profiles"])
+
+
+@router.get("", response_model=List[Dict[str, Any]])
+async def list_profiles(current_user: Principal = Depends(require_admin)):
+    """
+    Список сохраненных профилей (новые первыми)
+    Профиль создается запросом staff/admin с заголовком X-Profile: 1
+    """
+    return await asyncio.to_thread(profile_store.list)
+
+
+@router.get("/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("pstats", pattern="^(pstats|text)$", description="pstats - файл для snakeviz/pstats, text - отчет"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls)$"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: Principal = Depends(require_admin)
+):
+    """Профиль запроса: файл pstats или текстовый отчет"""
+    if format == "text":
+        report = await asyncio.to_thread(profile_store.report, profile_id, sort, limit)
+        if report is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Профиль не найден")
+        return PlainTextResponse(report)
+
+    path = profile_store.pstats_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Профиль не найден")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.pstats")
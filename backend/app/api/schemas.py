@@ -176,9 +176,12 @@ class AuditLogFilter(BaseModel):
 class AuditLogListResponse(BaseModel):
     """Список логов с пагинацией"""
     total: int
+    is_estimate: bool = False  # total - оценка планировщика, а не точный COUNT
     page: int
     limit: int
     logs: list[AuditLogResponse]
+    next_cursor: Optional[str] = None  # Курсор следующей страницы (keyset)
+    prev_cursor: Optional[str] = None  # Курсор предыдущей страницы (keyset)
 
 
 # ============= Прочее =============
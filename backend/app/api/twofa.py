@@ -1,19 +1,21 @@
 """
 API endpoints для двухфакторной аутентификации (2FA)
 """
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app.db.models.user import User
 from app.db.models.audit_log import OperationType, StatusType
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, limit_2fa_attempts, reset_rate_limit
+from app.auth.principal import invalidate_principal
 from app.auth.totp import (
     generate_totp_secret,
     get_totp_uri,
     generate_qr_code,
     verify_totp
 )
-from app.core.security import verify_password
+from app.core.security import verify_password_async
 from app.api.schemas import TwoFAEnable, TwoFAVerify, TwoFADisable, Message
 from app.middleware.logging import log_audit_event, get_client_ip
 
@@ -41,7 +43,7 @@ async def enable_2fa(
     
     # Генерация URI и QR кода
     uri = get_totp_uri(current_user.username, secret)
-    qr_code = generate_qr_code(uri)
+    qr_code = await asyncio.to_thread(generate_qr_code, uri)  # PIL - вне event loop
     
     # Сохранение секрета (пока не подтвержден)
     current_user.secret_2fa = secret
@@ -64,7 +66,7 @@ async def enable_2fa(
     )
 
 
-@router.post("/verify", response_model=Message)
+@router.post("/verify", response_model=Message, dependencies=[Depends(limit_2fa_attempts)])
 async def verify_2fa(
     verify_data: TwoFAVerify,
     request: Request,
@@ -98,6 +100,8 @@ async def verify_2fa(
     # Активация 2FA
     current_user.is_2fa_enabled = True
     await db.commit()
+    await invalidate_principal(current_user.id)
+    await reset_rate_limit("2fa_verify", str(current_user.id))
     
     # Логирование успешной активации
     await log_audit_event(
@@ -132,7 +136,7 @@ async def disable_2fa(
         )
     
     # Проверка пароля
-    if not verify_password(disable_data.password, current_user.password_hash):
+    if not await verify_password_async(disable_data.password, current_user.password_hash):
         await log_audit_event(
             db=db,
             operation=OperationType.TWO_FA_DISABLED,
@@ -150,6 +154,7 @@ async def disable_2fa(
     current_user.is_2fa_enabled = False
     current_user.secret_2fa = None
     await db.commit()
+    await invalidate_principal(current_user.id)
     
     # Логирование
     await log_audit_event(
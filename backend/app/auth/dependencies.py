@@ -8,19 +8,21 @@ from sqlalchemy import select
 from typing import Optional
 from app.db.database import get_db
 from app.db.models.user import User, UserRole
+from app.core.config import settings
+from app.core.rate_limit import rate_limiter
 from app.core.security import verify_token
+from app.auth.principal import Principal, principal_cache
+from app.middleware.logging import get_trusted_client_ip
 
 
 # Bearer схема для токенов (auto_error=False чтобы не выбрасывать 403 автоматически)
 security = HTTPBearer(auto_error=False)
 
 
-async def get_current_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: AsyncSession = Depends(get_db)
-) -> Optional[User]:
+def get_token_user_id(credentials: Optional[HTTPAuthorizationCredentials]) -> tuple[int, dict]:
     """
-    Получение текущего пользователя из JWT токена в Authorization header
+    Проверка JWT из Authorization header
+    Возвращает (user_id, payload)
     """
     import logging
     logger = logging.getLogger(__name__)
@@ -45,7 +47,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    logger.info(f"[AUTH] Token received, length: {len(access_token)}")
+    logger.info("[AUTH] Token received, length: %d", len(access_token))
     
     # Проверяем токен
     payload = verify_token(access_token, token_type="access")
@@ -71,16 +73,13 @@ async def get_current_user(
             detail="Недействительный токен (неверный user_id)"
         )
     
-    # Получаем пользователя из БД
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Пользователь не найден"
-        )
-    
+    return user_id, payload
+
+
+def check_user_access(user, payload: dict):
+    """
+    Проверка сессии и статуса аккаунта (для User и Principal)
+    """
     # Проверяем session_token (защита от использования на других устройствах)
     token_session = payload.get("session")
     if token_session and user.session_token and token_session != user.session_token:
@@ -100,10 +99,72 @@ async def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Аккаунт заблокирован"
         )
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> Optional[User]:
+    """
+    Получение текущего пользователя из JWT токена в Authorization header
+    Возвращает ORM объект User (для обработчиков, изменяющих пользователя)
+    """
+    user_id, payload = get_token_user_id(credentials)
+    
+    # Получаем пользователя из БД
+    generation = principal_cache.generation(user_id)
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Пользователь не найден"
+        )
+    
+    principal_cache.put(Principal.from_user(user), generation)
+    check_user_access(user, payload)
     
     return user
 
 
+async def get_current_principal(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """
+    Получение текущего пользователя как легкого Principal
+    При попадании в кэш запрос к БД не выполняется (сессия не берет соединение из пула)
+    """
+    user_id, payload = get_token_user_id(credentials)
+    return await load_principal(db, user_id, payload)
+
+
+async def load_principal(db: AsyncSession, user_id: int, payload: dict) -> Principal:
+    """
+    Principal из кэша или БД с проверкой сессии токена и статуса аккаунта
+    (используется и вне зависимостей FastAPI, например в middleware)
+    """
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        generation = principal_cache.generation(user_id)
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+        
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Пользователь не найден"
+            )
+        
+        principal = Principal.from_user(user)
+        principal_cache.put(principal, generation)
+    
+    check_user_access(principal, payload)
+    
+    return principal
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -114,8 +175,9 @@ async def get_current_active_user(
 def require_role(required_roles: list[UserRole]):
     """
     Dependency для проверки роли пользователя
+    Возвращает Principal (без обращения к БД при попадании в кэш)
     """
-    async def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    async def role_checker(current_user: Principal = Depends(get_current_principal)) -> Principal:
         if current_user.role not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -131,3 +193,69 @@ require_admin = require_role([UserRole.ADMIN])
 require_staff = require_role([UserRole.ADMIN, UserRole.STAFF])
 require_user = require_role([UserRole.ADMIN, UserRole.STAFF, UserRole.USER])
 
+
+
+# ============= Ограничение частоты попыток =============
+
+def rate_limit_key(scope: str, kind: str, value: str) -> str:
+    return f"{scope}:{kind}:{value.lower()}"[:255]
+
+
+async def enforce_rate_limit(request: Request, scope: str, identity: Optional[str] = None):
+    """
+    Учет попытки по IP клиента и (если известен) по идентификатору
+    При превышении лимита - 429 с Retry-After, до обращения к БД и bcrypt
+    """
+    import logging
+    logger = logging.getLogger(__name__)
+    
+    window = settings.LOGIN_ATTEMPTS_WINDOW
+    # Не get_client_ip: подменой X-Forwarded-For клиент получал бы новый ключ на каждый запрос
+    client_ip = get_trusted_client_ip(request)
+    checks = [(rate_limit_key(scope, "ip", client_ip), settings.LOGIN_ATTEMPTS_IP_LIMIT)]
+    if identity:
+        checks.append((rate_limit_key(scope, "id", identity), settings.LOGIN_ATTEMPTS_LIMIT))
+    
+    retry_after = None
+    for key, limit in checks:
+        key_retry = await rate_limiter.hit(key, limit, window)
+        if key_retry is not None:
+            retry_after = max(retry_after or 0, key_retry)
+    
+    if retry_after is not None:
+        logger.warning("[RATE LIMIT] %s rejected for %s (%s)", scope, client_ip, identity or '-')
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много попыток. Повторите позже.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+async def reset_rate_limit(scope: str, identity: str):
+    """Сброс счетчика идентификатора после успешной попытки"""
+    await rate_limiter.reset(rate_limit_key(scope, "id", identity), settings.LOGIN_ATTEMPTS_WINDOW)
+
+
+async def limit_login_attempts(request: Request):
+    """Лимит попыток входа по username (из тела запроса) и IP"""
+    try:
+        body = await request.json()  # Тело уже прочитано FastAPI и закэшировано
+        username = body.get("username") if isinstance(body, dict) else None
+    except ValueError:
+        username = None
+    await enforce_rate_limit(request, "login", username if isinstance(username, str) else None)
+
+
+async def limit_email_verification(request: Request):
+    """Лимит попыток подтверждения email по username и IP"""
+    await enforce_rate_limit(request, "verify_email", request.query_params.get("username"))
+
+
+async def limit_2fa_attempts(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
+):
+    """Лимит попыток ввода TOTP по пользователю из токена и IP (без запроса к БД)"""
+    payload = verify_token(credentials.credentials) if credentials else None
+    user_id = str(payload.get("sub")) if payload and payload.get("sub") is not None else None
+    await enforce_rate_limit(request, "2fa_verify", user_id)
@@ -0,0 +1,125 @@
+"""
+Кэш аутентифицированных пользователей (principal) в пределах воркера
+
+Для проверки JWT на каждом запросе не нужен полный ORM объект User:
+достаточно легкого principal с id, ролью, session_token и флагами.
+Кэш инвалидируется явно при изменении пользователя (блокировка, роль,
+удаление, 2FA, вход) через шину инвалидации - во всех воркерах - и
+ограничен по времени жизни записей.
+"""
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.invalidation import InvalidationKind, invalidation_bus
+from app.db.models.user import User, UserRole
+
+
+class Principal:
+    """Снимок пользователя, достаточный для авторизации и /auth/me"""
+    __slots__ = (
+        "id",
+        "username",
+        "email",
+        "role",
+        "session_token",
+        "is_active",
+        "is_blocked",
+        "is_2fa_enabled",
+        "created_at",
+        "last_login",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        username: str,
+        email: str,
+        role: UserRole,
+        session_token: Optional[str],
+        is_active: bool,
+        is_blocked: bool,
+        is_2fa_enabled: bool,
+        created_at: Optional[datetime],
+        last_login: Optional[datetime],
+    ):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.role = role
+        self.session_token = session_token
+        self.is_active = is_active
+        self.is_blocked = is_blocked
+        self.is_2fa_enabled = is_2fa_enabled
+        self.created_at = created_at
+        self.last_login = last_login
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            role=user.role,
+            session_token=user.session_token,
+            is_active=user.is_active,
+            is_blocked=user.is_blocked,
+            is_2fa_enabled=user.is_2fa_enabled,
+            created_at=user.created_at,
+            last_login=user.last_login,
+        )
+
+    def __repr__(self):
+        return f"<Principal {self.username} ({self.role})>"
+
+
+class PrincipalCache:
+    """
+    LRU/TTL кэш principal по id пользователя
+
+    Поколения защищают от гонки "чтение из БД -> инвалидация -> запись в кэш
+    устаревших данных": put() сохраняет principal, только если с момента
+    generation() инвалидации этого пользователя не было.
+    """
+
+    def __init__(self, maxsize: int = settings.PRINCIPAL_CACHE_SIZE, ttl: float = settings.PRINCIPAL_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations: Dict[int, int] = {}
+        self._epoch = 0
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        return self._cache.get(user_id)
+
+    def generation(self, user_id: int) -> tuple:
+        """Метка поколения, снимаемая перед чтением пользователя из БД"""
+        return self._epoch, self._generations.get(user_id, 0)
+
+    def put(self, principal: Principal, generation: Optional[tuple] = None):
+        if generation is not None and generation != self.generation(principal.id):
+            return
+        self._cache.set(principal.id, principal)
+
+    def invalidate(self, user_id: int):
+        """Удаление пользователя из кэша (после изменения в БД)"""
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        self._cache.pop(user_id)
+
+    def clear(self):
+        """Полная очистка (например, при потере уведомлений об изменениях)"""
+        self._epoch += 1
+        self._generations.clear()
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._cache), "hits": self._cache.hits, "misses": self._cache.misses}
+
+
+principal_cache = PrincipalCache()
+invalidation_bus.subscribe(InvalidationKind.PRINCIPAL, principal_cache.invalidate)
+invalidation_bus.on_flush(principal_cache.clear)
+
+
+async def invalidate_principal(user_id: int):
+    """Инвалидация principal во всех воркерах (вызывать после commit)"""
+    await invalidation_bus.publish(InvalidationKind.PRINCIPAL, user_id)
@@ -0,0 +1,171 @@
+"""
+Фоновая пакетная запись журнала аудита
+
+События складываются в ограниченную asyncio-очередь, а фоновая задача
+записывает их многострочными INSERT по достижении размера пакета
+или по таймеру. При остановке приложения очередь дренируется.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.audit_rollups import apply_rollups
+from app.db.models.audit_log import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# Маркер остановки фоновой задачи
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Асинхронный писатель журнала аудита
+
+    Очередь ограничена AUDIT_QUEUE_MAXSIZE: при переполнении enqueue()
+    ждет освобождения места (backpressure), события не теряются.
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        max_queue: int = settings.AUDIT_QUEUE_MAXSIZE,
+        batch_size: int = settings.AUDIT_BATCH_SIZE,
+        flush_interval: float = settings.AUDIT_FLUSH_INTERVAL,
+    ):
+        self._session_factory = session_factory
+        self._max_queue = max_queue
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Метрики
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.backpressure_waits = 0
+
+    @property
+    def running(self) -> bool:
+        """Запущена ли фоновая задача"""
+        return self._task is not None and not self._task.done()
+
+    @property
+    def queue_depth(self) -> int:
+        """Текущее количество событий в очереди"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Запуск фоновой задачи (вызывается из lifespan)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self._max_queue)
+        self._task = asyncio.create_task(self._run(), name="audit-writer")
+        logger.info("Audit writer started")
+
+    async def stop(self, timeout: float = settings.AUDIT_SHUTDOWN_TIMEOUT):
+        """Остановка с дренированием очереди"""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Audit writer drain timed out, {self.queue_depth} events lost")
+            self._task.cancel()
+        self._task = None
+        logger.info("Audit writer stopped")
+
+    async def enqueue(self, entry: Dict[str, Any]):
+        """Постановка события в очередь"""
+        if self._queue.full():
+            self.backpressure_waits += 1
+        await self._queue.put(entry)
+        self.enqueued += 1
+
+    async def _run(self):
+        """Основной цикл: сбор пакета по размеру или таймеру и запись"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self._flush_interval
+
+            while len(batch) < self._batch_size:
+                # Сначала забираем все, что уже лежит в очереди
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        """Запись пакета одним многострочным INSERT и обновление агрегатов"""
+        started = time.perf_counter()
+        try:
+            async with self._session_factory() as session:
+                await session.execute(insert(AuditLog).values(batch))
+                await apply_rollups(session, batch)
+                await session.commit()
+            self.written += len(batch)
+        except Exception as e:
+            # Ошибка записи не должна останавливать писателя
+            self.failed += len(batch)
+            logger.error(f"Error writing audit batch of {len(batch)} events: {e}")
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.batches += 1
+            self.last_batch_size = len(batch)
+            self.max_batch_size = max(self.max_batch_size, len(batch))
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики очереди и записи"""
+        return {
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "queue_capacity": self._max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": round(self.written / self.batches, 2) if self.batches else 0,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.batches, 3) if self.batches else 0,
+            "backpressure_waits": self.backpressure_waits,
+        }
+
+
+audit_writer = AuditWriter()
@@ -0,0 +1,378 @@
+"""
+Каталог товаров в памяти воркера (read model)
+
+Таблица products загружается один раз при старте и затем обновляется
+инкрементально: каждые CATALOG_REFRESH_INTERVAL секунд читаются только
+строки с updated_at не раньше водяного знака (минус CATALOG_REFRESH_OVERLAP -
+транзакция, начатая раньше, может зафиксироваться позже следующего чтения).
+Повторно прочитанные строки с тем же updated_at пропускаются.
+
+Индексы: id -> товар и нормализованная категория -> товары (по id).
+Списки заменяются целиком и не изменяются на месте, поэтому чтение из
+обработчиков не требует блокировок и не обращается к пулу БД.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_category(category: Optional[str]) -> str:
+    """Ключ категории: без регистра и лишних пробелов"""
+    return " ".join((category or "").split()).casefold()
+
+
+def _fingerprint(item: "CatalogItem") -> int:
+    """Отпечаток версии строки: меняется при каждом обновлении (триггер updated_at)"""
+    updated_at = item.updated_at.isoformat() if item.updated_at else ""
+    digest = hashlib.blake2b(f"{item.id}|{updated_at}".encode(), digest_size=16).digest()
+    return int.from_bytes(digest, "big")
+
+
+class CatalogItem:
+    """Снимок товара (неизменяемый по соглашению)"""
+    __slots__ = (
+        "id",
+        "name",
+        "description",
+        "price",
+        "category",
+        "image_url",
+        "in_stock",
+        "updated_at",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        name: str,
+        description: str,
+        price: float,
+        category: str,
+        image_url: Optional[str],
+        in_stock: bool,
+        updated_at: Optional[datetime] = None,
+    ):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.price = price
+        self.category = category
+        self.image_url = image_url
+        self.in_stock = in_stock
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_product(cls, product: Product) -> "CatalogItem":
+        return cls(
+            id=product.id,
+            name=product.name,
+            description=product.description or "",
+            price=float(product.price),
+            category=product.category,
+            image_url=product.image_url,
+            in_stock=product.in_stock,
+            updated_at=product.updated_at,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Поля ответа API (схема app.api.products.Product)"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "price": self.price,
+            "category": self.category,
+            "image_url": self.image_url,
+            "in_stock": self.in_stock,
+        }
+
+    def __repr__(self):
+        return f"<CatalogItem {self.id}: {self.name}>"
+
+
+# Получает измененные/добавленные товары и id удаленных
+ChangeListener = Callable[[List[CatalogItem], List[int]], None]
+
+
+class CatalogReadModel:
+    """Индексированный каталог с фоновым инкрементальным обновлением"""
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        refresh_interval: float = settings.CATALOG_REFRESH_INTERVAL,
+        overlap: float = settings.CATALOG_REFRESH_OVERLAP,
+    ):
+        self._session_factory = session_factory
+        self._refresh_interval = refresh_interval
+        self._overlap = timedelta(seconds=overlap)
+        self._task: Optional[asyncio.Task] = None
+
+        self._by_id: Dict[int, CatalogItem] = {}
+        self._members: Dict[str, Dict[int, CatalogItem]] = {}
+        self._by_category: Dict[str, List[CatalogItem]] = {}
+        self._all: List[CatalogItem] = []
+        self._watermark: Optional[datetime] = None
+        self._digest = 0  # сумма отпечатков (id, updated_at) всех товаров
+        self._listeners: List[ChangeListener] = []
+        self.loaded = False
+        self.version = ""
+
+        # Метрики
+        self.refreshes = 0
+        self.failed = 0
+        self.applied = 0
+        self.last_refresh_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def get(self, product_id: int) -> Optional[CatalogItem]:
+        return self._by_id.get(product_id)
+
+    def list(self, category: Optional[str] = None) -> List[CatalogItem]:
+        """Товары (по id) всей витрины или категории; список не изменять"""
+        if not category:
+            return self._all
+        return self._by_category.get(normalize_category(category), [])
+
+    def on_change(self, listener: ChangeListener):
+        """
+        Подписка производных индексов на изменения каталога
+        Если каталог уже загружен, слушатель сразу получает все товары
+        """
+        self._listeners.append(listener)
+        if self._all:
+            listener(list(self._all), [])
+
+    async def start(self):
+        """Первичная загрузка и запуск обновления (вызывается из lifespan)"""
+        if self.running:
+            return
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Загрузка повторится в фоновой задаче
+            logger.error("Catalog initial load failed: %s", e)
+        self._task = asyncio.create_task(self._run(), name="catalog-refresh")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("Catalog refresh failed: %s", e)
+
+    async def refresh(self) -> bool:
+        """Чтение изменений после водяного знака; True, если каталог изменился"""
+        started = time.perf_counter()
+        stmt = select(Product).order_by(Product.updated_at)
+        if self._watermark is None:
+            stmt = stmt.where(Product.is_active.is_(True))
+        else:
+            stmt = stmt.where(Product.updated_at >= self._watermark - self._overlap)
+        try:
+            async with self._session_factory() as session:
+                products = (await session.execute(stmt)).scalars().all()
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.last_refresh_ms = (time.perf_counter() - started) * 1000
+
+        upserts = [CatalogItem.from_product(p) for p in products if p.is_active]
+        removed = [p.id for p in products if not p.is_active]
+        for product in products:
+            if not product.is_active:
+                self._advance_watermark(product.updated_at)
+        changed = self.apply(upserts, removed)
+        self.refreshes += 1
+        if changed:
+            logger.info("Catalog refreshed: %d products, version %s", len(self._by_id), self.version)
+        return changed
+
+    def apply(self, upserts: Iterable[CatalogItem], removed: Iterable[int] = ()) -> bool:
+        """Применение изменений к индексам (синхронно, без await)"""
+        touched = set()
+        changed: List[CatalogItem] = []
+        deleted: List[int] = []
+        for item in upserts:
+            self._advance_watermark(item.updated_at)
+            current = self._by_id.get(item.id)
+            if current is not None and item.updated_at is not None and current.updated_at == item.updated_at:
+                continue  # Повторно прочитано из окна перекрытия
+            if current is not None:
+                self._remove_member(current)
+                self._digest -= _fingerprint(current)
+                touched.add(normalize_category(current.category))
+            key = normalize_category(item.category)
+            self._members.setdefault(key, {})[item.id] = item
+            self._by_id[item.id] = item
+            self._digest += _fingerprint(item)
+            touched.add(key)
+            changed.append(item)
+        for product_id in removed:
+            current = self._by_id.pop(product_id, None)
+            if current is not None:
+                self._remove_member(current)
+                self._digest -= _fingerprint(current)
+                touched.add(normalize_category(current.category))
+                deleted.append(product_id)
+
+        first_load = not self.loaded
+        self.loaded = True
+        if not touched and not first_load:
+            return False
+
+        # Перестраиваются только списки затронутых категорий
+        for key in touched:
+            members = self._members.get(key)
+            if members:
+                self._by_category[key] = sorted(members.values(), key=lambda item: item.id)
+            else:
+                self._by_category.pop(key, None)
+        self._all = sorted(self._by_id.values(), key=lambda item: item.id)
+        self.applied += len(changed) + len(deleted)
+        self.version = self._compute_version()
+        for listener in self._listeners:
+            try:
+                listener(changed, deleted)
+            except Exception as e:
+                logger.error("Catalog change listener failed: %s", e)
+        return True
+
+    def _advance_watermark(self, updated_at: Optional[datetime]):
+        if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+            self._watermark = updated_at
+
+    def _remove_member(self, item: CatalogItem):
+        key = normalize_category(item.category)
+        members = self._members.get(key)
+        if members is not None:
+            members.pop(item.id, None)
+            if not members:
+                del self._members[key]
+
+    def _compute_version(self) -> str:
+        """
+        Версия из содержимого, а не счетчик: одинакова во всех воркерах,
+        увидевших одно и то же состояние таблицы. Водяного знака и числа
+        строк мало - изменение из окна перекрытия их не меняет, поэтому
+        берется сумма отпечатков (id, updated_at) всех товаров
+        """
+        digest = self._digest % (1 << 128)
+        return hashlib.sha256(f"{digest:032x}|{len(self._by_id)}".encode()).hexdigest()[:16]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "loaded": self.loaded,
+            "products": len(self._by_id),
+            "categories": len(self._by_category),
+            "version": self.version,
+            "refreshes": self.refreshes,
+            "failed_refreshes": self.failed,
+            "last_refresh_ms": round(self.last_refresh_ms, 3),
+        }
+
+
+def encode_items(items: Iterable[CatalogItem]) -> bytes:
+    """JSON массив товаров (как ответ с response_model=List[Product])"""
+    return json.dumps(
+        [item.to_dict() for item in items],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class CachedResponse:
+    """Готовое тело ответа и его валидаторы"""
+    __slots__ = ("body", "etag", "total")
+
+    def __init__(self, body: bytes, etag: str, total: int):
+        self.body = body
+        self.etag = etag
+        self.total = total
+
+
+class CatalogResponseCache:
+    """
+    JSON ответы списка товаров, закодированные один раз на версию каталога
+
+    ETag строгий: тело однозначно определяется версией каталога и ключом
+    (категория, страница, сортировка), а URL уже различает ключи. При смене
+    версии кэш очищается целиком при следующем обращении.
+
+    source - то, из чего строятся тела (read model или производный индекс):
+    нужен только атрибут version.
+    """
+
+    def __init__(self, source: Any, maxsize: int = settings.CATALOG_RESPONSE_CACHE_SIZE):
+        self._source = source
+        self._cache = TTLCache(maxsize=maxsize, ttl=float("inf"))
+        self._version: Optional[str] = None
+        self.invalidations = 0
+
+    def etag(self) -> str:
+        return f'"{self._source.version}"'
+
+    def get(self, key: Hashable, build: Callable[[], Tuple[List[CatalogItem], int]]) -> CachedResponse:
+        """Ответ из кэша; build (товары страницы, всего) вызывается только при промахе"""
+        def build_body() -> Tuple[bytes, int]:
+            items, total = build()
+            return encode_items(items), total
+        return self.get_body(key, build_body)
+
+    def get_body(self, key: Hashable, build: Callable[[], Tuple[bytes, int]]) -> CachedResponse:
+        """То же для произвольного тела: build возвращает (JSON байты, всего)"""
+        version = self._source.version
+        if version != self._version:
+            if self._version is not None:
+                self.invalidations += 1
+            self._cache.clear()
+            self._version = version
+
+        entry = self._cache.get(key)
+        if entry is None:
+            body, total = build()
+            entry = CachedResponse(body, self.etag(), total)
+            self._cache.set(key, entry)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._cache),
+            "hits": self._cache.hits,
+            "misses": self._cache.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+catalog = CatalogReadModel()
@@ -16,6 +16,8 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 часа (было 30 минут)
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30  # 30 дней (было 7)
+    TOKEN_CACHE_SIZE: int = 10000  # проверенных JWT в кэше воркера (0 - без кэша)
+    TOKEN_CACHE_TTL: float = 300.0  # секунды, не дольше exp токена
     
     # CORS
     ALLOWED_ORIGINS: str = "http://localhost:3000,https://localhost:3000,http://localhost,https://localhost,http://127.0.0.1:3000"
@@ -31,9 +33,113 @@ class Settings(BaseSettings):
     APP_NAME: str = "Optics Security System"
     VERSION: str = "1.0.0"
     
+    # Инструментирование SQL
+    SQL_ECHO: bool = False  # вывод каждого запроса движком (не зависит от DEBUG)
+    SQL_SLOW_QUERY_MS: float = 200.0
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10  # одинаковых запросов за HTTP запрос
+    
+    # Мониторинг задержки event loop
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL: float = 0.1  # секунды между замерами
+    LOOP_LAG_THRESHOLD: float = 0.25  # блокировка дольше - отчет со стеком
+    
+    # Профилирование запросов (X-Profile: 1 или ?profile=1, только admin/staff)
+    PROFILING_ENABLED: bool = True
+    PROFILE_DIR: str = "logs/profiles"
+    PROFILE_RING_SIZE: int = 50
+    
+    # Метрики (/metrics): требуется Authorization: Bearer <METRICS_TOKEN>;
+    # без токена endpoint открыт только при DEBUG, иначе отвечает 404
+    METRICS_TOKEN: str = ""
+    HEALTH_DB_TIMEOUT: float = 2.0  # секунды на проверку БД в /health
+    
+    # Логирование (JSON через QueueHandler/QueueListener)
+    LOG_FILE: str = "logs/app.log"
+    LOG_JSON: bool = True
+    LOG_QUEUE_SIZE: int = 10000  # при переполнении записи отбрасываются
+    LOG_INFO_SAMPLE_RATE: float = 0.1  # доля INFO записей шумных логгеров
+    LOG_SAMPLED_LOGGERS: list[str] = ["app.access", "app.auth.dependencies", "app.api.auth"]
+    
+    # SMTP (письма с кодом подтверждения)
+    SMTP_HOST: str = "smtp.gmail.com"
+    SMTP_PORT: int = 587
+    SMTP_USERNAME: str = ""  # только из окружения / .env
+    SMTP_PASSWORD: str = ""  # только из окружения / .env (App Password)
+    SMTP_STARTTLS: bool = True
+    SMTP_TIMEOUT: float = 10.0  # секунды
+    SMTP_IDLE_TIMEOUT: float = 60.0  # закрытие простаивающего соединения
+    
+    # Очередь исходящих писем
+    EMAIL_QUEUE_MAXSIZE: int = 1000
+    EMAIL_BATCH_SIZE: int = 20
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_BASE_DELAY: float = 2.0  # секунды, удваивается с каждой попыткой
+    
     # Rate Limiting
     LOGIN_ATTEMPTS_LIMIT: int = 5
     LOGIN_ATTEMPTS_WINDOW: int = 300  # 5 minutes
+    LOGIN_ATTEMPTS_IP_LIMIT: int = 20  # попыток с одного IP за окно
+    # Прокси перед приложением, которым доверяем X-Forwarded-For (0 - прямое
+    # подключение, адрес сокета; 1 - за nginx из nginx/nginx.conf.https)
+    TRUSTED_PROXY_COUNT: int = 0
+    RATE_LIMIT_BACKEND: str = "memory"  # memory | postgres (общее состояние воркеров)
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_SHARDS: int = 16
+    
+    # Audit log writer (фоновая пакетная запись журнала)
+    AUDIT_QUEUE_MAXSIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL: float = 0.5  # секунды
+    AUDIT_SHUTDOWN_TIMEOUT: float = 10.0  # секунды на дренирование очереди
+    
+    # Секционирование audit_log по месяцам
+    AUDIT_PARTITIONS_AHEAD: int = 3  # сколько месяцев вперед создавать секции
+    AUDIT_RETENTION_MONTHS: int = 12  # 0 - хранить без ограничения
+    AUDIT_PARTITION_MAINTENANCE_INTERVAL: float = 3600.0  # секунды
+    
+    # Просмотры каталога: "counters" - агрегированные счетчики в product_view_stats,
+    # "audit" - отдельная запись audit_log на каждый просмотр (строгий аудит)
+    PRODUCT_VIEW_MODE: str = "counters"
+    PRODUCT_VIEW_FLUSH_INTERVAL: float = 10.0  # секунды
+    PRODUCT_VIEW_MAX_KEYS: int = 50000  # при превышении - внеочередной сброс
+    
+    # Кэш аутентифицированных пользователей (на воркер)
+    PRINCIPAL_CACHE_TTL: float = 60.0  # секунды
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    
+    # Хэширование паролей (bcrypt) вне event loop
+    HASHING_WORKERS: int = 4
+    HASHING_MAX_QUEUE: int = 64  # ожидающих операций сверх HASHING_WORKERS
+    HASHING_RETRY_AFTER: int = 1  # секунды, заголовок Retry-After при 503
+    
+    # Каталог товаров в памяти воркера
+    CATALOG_REFRESH_INTERVAL: float = 5.0  # секунды между инкрементальными обновлениями
+    CATALOG_REFRESH_OVERLAP: float = 5.0  # секунды перекрытия окна (поздние коммиты)
+    CATALOG_PAGE_SIZE: int = 24
+    CATALOG_RESPONSE_CACHE_SIZE: int = 512  # готовых JSON ответов списка
+    CATALOG_CACHE_MAX_AGE: int = 30  # секунды, Cache-Control для клиентов
+    CATALOG_PRICE_BUCKETS: list[float] = [2000.0, 5000.0, 10000.0, 20000.0]  # границы фасета цены
+    
+    # Поиск по каталогу: "memory" - индекс в воркере, "postgres" - GIN индекс tsvector
+    SEARCH_BACKEND: str = "memory"
+    SEARCH_PREFIX_MAX_TERMS: int = 50  # терминов на префикс последнего слова
+    SEARCH_MIN_PREFIX: int = 2
+    SEARCH_SCAN_THRESHOLD: int = 500  # документов редкого слова для полного перебора
+    SEARCH_CACHE_SIZE: int = 1024  # результатов запросов до изменения каталога
+    
+    # Шина инвалидации кэшей между воркерами (LISTEN/NOTIFY)
+    INVALIDATION_CHANNEL: str = "cache_invalidation"
+    INVALIDATION_HEARTBEAT: float = 15.0  # секунды
+    INVALIDATION_MAX_PENDING: int = 1000
+    INVALIDATION_SEND_TIMEOUT: float = 2.0  # секунды на pg_notify / heartbeat
+    
+    # Подсчет total для списков (журнал аудита)
+    COUNT_EXACT_THRESHOLD: int = 10000  # ниже оценки планировщика считаем точно
+    COUNT_CACHE_TTL: float = 30.0  # секунды
+    COUNT_CACHE_SIZE: int = 256
+    
+    # Экспорт журнала: строк на одну выборку серверного курсора
+    EXPORT_CHUNK_ROWS: int = 2000
     
     # Google OAuth (optional)
     GOOGLE_CLIENT_ID: str = ""
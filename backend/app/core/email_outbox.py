@@ -0,0 +1,272 @@
+"""
+Очередь исходящих писем с фоновой отправкой
+
+Обработчики только ставят письмо в ограниченную asyncio-очередь. Фоновая
+задача забирает письма пакетами и отправляет их в отдельном потоке через
+одно SMTP соединение, которое переиспользуется между пакетами и
+закрывается после простоя. Неудачные письма повторяются с экспоненциальной
+задержкой до EMAIL_MAX_ATTEMPTS попыток.
+"""
+import asyncio
+import logging
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Маркер остановки фоновой задачи
+_STOP = object()
+
+
+@dataclass
+class OutgoingEmail:
+    """Письмо в очереди (сообщение уже сериализовано)"""
+    sender: str
+    recipient: str
+    message: str
+    attempts: int = 0
+
+
+class SMTPConnection:
+    """
+    Переиспользуемое SMTP соединение
+
+    Блокирующий smtplib: методы вызываются только из потока отправки.
+    """
+
+    def __init__(
+        self,
+        host: str = settings.SMTP_HOST,
+        port: int = settings.SMTP_PORT,
+        username: str = settings.SMTP_USERNAME,
+        password: str = settings.SMTP_PASSWORD,
+        starttls: bool = settings.SMTP_STARTTLS,
+        timeout: float = settings.SMTP_TIMEOUT,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self.connections = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.connections += 1
+        return server
+
+    def _ensure(self) -> smtplib.SMTP:
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except smtplib.SMTPException:
+                pass
+            self.close()
+        self._server = self._connect()
+        return self._server
+
+    def send_batch(self, emails: List[OutgoingEmail]) -> List[Optional[Exception]]:
+        """Отправка пакета через одно соединение; ошибка для каждого письма или None"""
+        results: List[Optional[Exception]] = []
+        for email in emails:
+            try:
+                try:
+                    self._ensure().sendmail(email.sender, email.recipient, email.message)
+                except smtplib.SMTPServerDisconnected:
+                    # Сервер закрыл соединение между письмами - одна повторная попытка
+                    self.close()
+                    self._ensure().sendmail(email.sender, email.recipient, email.message)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        self._last_used = time.monotonic()
+        return results
+
+    def close_if_idle(self, idle_timeout: float):
+        if self._server is not None and time.monotonic() - self._last_used > idle_timeout:
+            self.close()
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+
+class EmailOutbox:
+    """Асинхронная очередь писем с пакетной отправкой и повторами"""
+
+    def __init__(
+        self,
+        connection: Optional[SMTPConnection] = None,
+        max_queue: int = settings.EMAIL_QUEUE_MAXSIZE,
+        batch_size: int = settings.EMAIL_BATCH_SIZE,
+        max_attempts: int = settings.EMAIL_MAX_ATTEMPTS,
+        retry_base_delay: float = settings.EMAIL_RETRY_BASE_DELAY,
+        idle_timeout: float = settings.SMTP_IDLE_TIMEOUT,
+    ):
+        self.connection = connection or SMTPConnection()
+        self._max_queue = max_queue
+        self._batch_size = batch_size
+        self._max_attempts = max_attempts
+        self._retry_base_delay = retry_base_delay
+        self._idle_timeout = idle_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._retries: Dict[asyncio.TimerHandle, OutgoingEmail] = {}
+
+        # Метрики
+        self.enqueued = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Запуск фоновой отправки (вызывается из lifespan)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self._max_queue)
+        # Один поток: smtplib соединение не потокобезопасно
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smtp")
+        self._task = asyncio.create_task(self._run(), name="email-outbox")
+        logger.info("Email outbox started")
+
+    async def stop(self, timeout: float = settings.SMTP_TIMEOUT * 2):
+        """Остановка: отложенные повторы отправляются сразу, очередь дренируется"""
+        if not self.running:
+            return
+        for handle, email in list(self._retries.items()):
+            handle.cancel()
+            self.enqueue(email)
+        self._retries.clear()
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Email outbox drain timed out, {self.queue_depth} emails lost")
+            self._task.cancel()
+        self._task = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.connection.close)
+        self._executor.shutdown(wait=False)
+        self._executor = None
+        logger.info("Email outbox stopped")
+
+    def enqueue(self, email: OutgoingEmail) -> bool:
+        """Постановка письма в очередь; False, если очередь переполнена"""
+        try:
+            self._queue.put_nowait(email)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error(f"Email outbox is full, message to {email.recipient} dropped")
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _run(self):
+        """Основной цикл: пакет из уже накопленных писем -> отправка"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            try:
+                item = await asyncio.wait_for(self._queue.get(), self._idle_timeout)
+            except asyncio.TimeoutError:
+                await loop.run_in_executor(self._executor, self.connection.close_if_idle, self._idle_timeout)
+                continue
+            if item is _STOP:
+                break
+
+            batch = [item]
+            while len(batch) < self._batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._deliver(batch, final=stopping)
+
+    async def _deliver(self, batch: List[OutgoingEmail], final: bool = False):
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+        try:
+            results = await loop.run_in_executor(self._executor, self.connection.send_batch, batch)
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for email, error in zip(batch, results):
+            if error is None:
+                self.sent += 1
+                continue
+            email.attempts += 1
+            if email.attempts >= self._max_attempts or final:
+                self.failed += 1
+                logger.error(f"Email to {email.recipient} failed after {email.attempts} attempts: {error}")
+                continue
+            delay = self._retry_base_delay * 2 ** (email.attempts - 1)
+            self.retried += 1
+            logger.warning(f"Email to {email.recipient} failed ({error}), retry in {delay:.1f}s")
+            self._schedule_retry(email, delay)
+
+    def _schedule_retry(self, email: OutgoingEmail, delay: float):
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._retries.pop(handle, None)
+            if not self.running or not self.enqueue(email):
+                self.failed += 1
+                logger.error(f"Email to {email.recipient} lost: outbox is not accepting retries")
+
+        handle = loop.call_later(delay, requeue)
+        self._retries[handle] = email
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "pending_retries": len(self._retries),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "smtp_connections": self.connection.connections,
+        }
+
+
+email_outbox = EmailOutbox()
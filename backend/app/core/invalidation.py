@@ -0,0 +1,203 @@
+"""
+Шина инвалидации in-process кэшей между воркерами (PostgreSQL LISTEN/NOTIFY)
+
+Каждый воркер держит одно выделенное asyncpg соединение, подписанное на
+канал INVALIDATION_CHANNEL. Изменяющие обработчики публикуют типизированные
+сообщения (вид + ключ): сообщение сразу применяется локально, а рассылку
+остальным воркерам через pg_notify выполняет фоновая задача - обработчик
+ее не ждет, и медленное соединение не задерживает запросы. После разрыва соединения уведомления
+могли быть потеряны, поэтому при переподключении выполняется полная
+очистка всех зарегистрированных кэшей.
+"""
+import asyncio
+import enum
+import json
+import logging
+import os
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import asyncpg
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationKind(str, enum.Enum):
+    """Виды сообщений инвалидации"""
+    PRINCIPAL = "principal"  # ключ - id пользователя
+    ALL = "all"  # полная очистка всех кэшей
+
+
+Handler = Callable[[Any], None]
+
+
+class InvalidationBus:
+    """Pub/sub инвалидации кэшей"""
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        channel: str = settings.INVALIDATION_CHANNEL,
+        heartbeat: float = settings.INVALIDATION_HEARTBEAT,
+    ):
+        self._dsn = dsn or settings.DATABASE_URL.replace("+asyncpg", "")
+        self._channel = channel
+        self._heartbeat = heartbeat
+        self._source = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._flush_handlers: List[Callable[[], None]] = []
+        self._conn: Optional[asyncpg.Connection] = None
+        self._wake = asyncio.Event()  # есть неотправленные сообщения
+        self._task: Optional[asyncio.Task] = None
+        self._pending: List[str] = []
+
+        # Метрики
+        self.published = 0
+        self.received = 0
+        self.reconnects = 0
+        self.full_flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def subscribe(self, kind: InvalidationKind, handler: Handler):
+        """Обработчик сообщений вида kind (получает ключ)"""
+        self._handlers.setdefault(kind.value, []).append(handler)
+
+    def on_flush(self, handler: Callable[[], None]):
+        """Обработчик полной очистки (вызывается после разрыва соединения)"""
+        self._flush_handlers.append(handler)
+
+    async def start(self):
+        """Запуск (вызывается из lifespan)"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(), name="invalidation-bus")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self._close()
+
+    async def publish(self, kind: InvalidationKind, key: Any = None):
+        """
+        Применение сообщения локально и постановка в очередь рассылки
+        Отправку выполняет фоновая задача; при ошибке сообщение остается
+        в очереди и отправляется после переподключения
+        """
+        self._dispatch(kind.value, key)
+        if not self.running:
+            return
+
+        payload = json.dumps({"k": kind.value, "key": key, "src": self._source})
+        self._pending.append(payload)
+        if len(self._pending) > settings.INVALIDATION_MAX_PENDING:
+            # Слишком много неотправленного - заменяем одной полной очисткой
+            self._pending = [json.dumps({"k": InvalidationKind.ALL.value, "key": None, "src": self._source})]
+        self._wake.set()
+
+    async def _execute(self, query: str, *args):
+        """Запрос на соединении шины; зависшее соединение - ошибка и переподключение"""
+        await asyncio.wait_for(self._conn.execute(query, *args), settings.INVALIDATION_SEND_TIMEOUT)
+
+    async def _send_pending(self):
+        if self._conn is None or self._conn.is_closed():
+            return
+        while self._pending:
+            await self._execute("SELECT pg_notify($1, $2)", self._channel, self._pending[0])
+            self._pending.pop(0)
+            self.published += 1
+
+    def _dispatch(self, kind: str, key: Any):
+        if kind == InvalidationKind.ALL.value:
+            self._flush_all()
+            return
+        for handler in self._handlers.get(kind, []):
+            try:
+                handler(key)
+            except Exception as e:
+                logger.error(f"Invalidation handler for {kind} failed: {e}")
+
+    def _flush_all(self):
+        self.full_flushes += 1
+        for handler in self._flush_handlers:
+            try:
+                handler()
+            except Exception as e:
+                logger.error(f"Invalidation flush handler failed: {e}")
+
+    def _on_notification(self, connection, pid, channel, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("src") == self._source:
+            return  # Уже применено локально при публикации
+        self.received += 1
+        self._dispatch(message.get("k"), message.get("key"))
+
+    async def _connect(self):
+        self._conn = await asyncpg.connect(self._dsn)
+        await self._conn.add_listener(self._channel, self._on_notification)
+
+    async def _close(self):
+        if self._conn is not None and not self._conn.is_closed():
+            try:
+                await self._conn.close(timeout=2)
+            except Exception:
+                self._conn.terminate()
+        self._conn = None
+
+    async def _run(self):
+        """Подключение, heartbeat и переподключение с экспоненциальной задержкой"""
+        delay = 1.0
+        first = True
+        while True:
+            try:
+                await self._connect()
+                if not first:
+                    # Пока соединения не было, уведомления могли потеряться
+                    self.reconnects += 1
+                    self._flush_all()
+                    logger.info("Invalidation bus reconnected, caches flushed")
+                first = False
+                delay = 1.0
+                await self._send_pending()
+
+                while True:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), self._heartbeat)
+                    except asyncio.TimeoutError:
+                        await self._execute("SELECT 1")
+                    self._wake.clear()
+                    await self._send_pending()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Invalidation bus connection lost: {e!r}; retry in {delay:.0f}s")
+                await self._close()
+                first = False
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "connected": self._conn is not None and not self._conn.is_closed(),
+            "pending": len(self._pending),
+            "published": self.published,
+            "received": self.received,
+            "reconnects": self.reconnects,
+            "full_flushes": self.full_flushes,
+        }
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,142 @@
+"""
+Неблокирующее логирование в формате JSON
+
+На пути запроса логирование сводится к постановке записи в очередь:
+корневой логгер имеет единственный QueueHandler, а форматирование (JSON,
+подстановка аргументов, traceback) и запись в файл/консоль выполняет
+QueueListener в отдельном потоке.
+
+- request_id: id текущего запроса из contextvar добавляется в каждую запись;
+- сэмплирование: INFO записи шумных логгеров (LOG_SAMPLED_LOGGERS)
+  пропускаются с вероятностью LOG_INFO_SAMPLE_RATE до постановки в очередь,
+  WARNING и выше пишутся всегда;
+- при переполнении очереди записи отбрасываются и считаются, запрос не ждет.
+"""
+import logging
+import os
+import queue
+import random
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Mapping, Optional
+
+from pythonjsonlogger import jsonlogger
+from app.core.config import settings
+
+# id текущего запроса (устанавливается RequestIdMiddleware)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_listener: Optional[QueueListener] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавление request_id в запись"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Сэмплирование INFO и ниже для выбранных логгеров"""
+
+    def __init__(self, loggers, rate: float):
+        super().__init__()
+        self._prefixes = tuple(loggers)
+        self._rate = rate
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not record.name.startswith(self._prefixes):
+            return True
+        if random.random() < self._rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+# Неизменяемые аргументы, которые безопасно форматировать в другом потоке
+PRIMITIVE_TYPES = (str, int, float, bool, type(None))
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler без форматирования в вызывающем потоке
+
+    Стандартный prepare() сразу подставляет аргументы и форматирует
+    traceback; здесь это делает поток QueueListener. Исключение - аргументы
+    не примитивных типов: к моменту форматирования объект может измениться,
+    а ORM объект - обратиться к БД вне event loop, поэтому такое сообщение
+    форматируется сразу.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, Mapping) else args
+            if not all(type(value) in PRIMITIVE_TYPES for value in values):
+                record.msg = record.getMessage()
+                record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _formatter() -> logging.Formatter:
+    if settings.LOG_JSON:
+        return jsonlogger.JsonFormatter(
+            "%(asctime)s %(name)s %(levelname)s %(message)s %(request_id)s",
+            rename_fields={"levelname": "level", "name": "logger"},
+        )
+    return logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s")
+
+
+def setup_logging() -> LazyQueueHandler:
+    """Настройка корневого логгера (однократно при импорте приложения)"""
+    global _listener
+    if _listener is not None:
+        return next(h for h in logging.getLogger().handlers if isinstance(h, LazyQueueHandler))
+
+    os.makedirs(os.path.dirname(settings.LOG_FILE) or ".", exist_ok=True)
+    formatter = _formatter()
+
+    file_handler = RotatingFileHandler(
+        settings.LOG_FILE,
+        maxBytes=10485760,  # 10MB
+        backupCount=10
+    )
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()  # Также вывод в консоль
+    stream_handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLED_LOGGERS, settings.LOG_INFO_SAMPLE_RATE))
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return queue_handler
+
+
+def shutdown_logging():
+    """Запись оставшихся сообщений и остановка потока (вызывается из lifespan)"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
@@ -0,0 +1,141 @@
+"""
+Мониторинг задержки event loop
+
+Задача в event loop просыпается каждые LOOP_MONITOR_INTERVAL секунд и
+записывает опоздание пробуждения (lag) в гистограмму. Отдельный поток
+следит за последним пробуждением: если loop не отвечает дольше
+LOOP_LAG_THRESHOLD, поток снимает стек потока event loop и логирует его
+вместе с маршрутом запроса, задача которого выполнялась в этот момент.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин задержки, секунды
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STACK_LIMIT = 30  # кадров стека в отчете
+
+
+class LoopMonitor:
+    """Измерение lag и сторож блокировок event loop"""
+
+    def __init__(
+        self,
+        interval: float = settings.LOOP_MONITOR_INTERVAL,
+        threshold: float = settings.LOOP_LAG_THRESHOLD,
+    ):
+        self._interval = interval
+        self._threshold = threshold
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._heartbeat = 0.0
+
+        # Маршрут по задаче запроса (заполняет TimingMiddleware)
+        self.active_requests: Dict[asyncio.Task, str] = {}
+
+        # Метрики
+        self.lag = Histogram(buckets=LAG_BUCKETS)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.recent_stalls: Deque[Dict[str, Any]] = deque(maxlen=20)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def request_started(self, route: str):
+        task = asyncio.current_task()
+        if task is not None:
+            self.active_requests[task] = route
+
+    def request_finished(self):
+        self.active_requests.pop(asyncio.current_task(), None)
+
+    async def start(self):
+        """Запуск (вызывается из lifespan)"""
+        if self.running or not settings.LOOP_MONITOR_ENABLED:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._run(), name="loop-monitor")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._stop_event.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._thread.join(timeout=self._interval * 2)
+        self._thread = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            self._heartbeat = time.monotonic()
+
+    def _current_route(self) -> str:
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return "-"
+        return self.active_requests.get(task) or task.get_name()
+
+    def _watch(self):
+        """Поток-сторож: один отчет на каждую блокировку"""
+        reported_heartbeat = None
+        while not self._stop_event.wait(self._interval / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self._interval
+            if blocked < self._threshold or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT)) if frame is not None else ""
+            route = self._current_route()
+            self.stalls += 1
+            self.recent_stalls.append({
+                "at": time.time(),
+                "blocked_ms": round(blocked * 1000, 1),
+                "route": route,
+                "stack": stack,
+            })
+            logger.warning("Event loop blocked for %.0fms in %s\n%s", blocked * 1000, route, stack)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "p50_ms": self.lag.quantile(0.5) * 1000,
+            "p90_ms": self.lag.quantile(0.9) * 1000,
+            "p99_ms": self.lag.quantile(0.99) * 1000,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "stalls": self.stalls,
+        }
+
+
+loop_monitor = LoopMonitor()
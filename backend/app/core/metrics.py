@@ -0,0 +1,127 @@
+"""
+In-process метрики воркера
+
+Гистограммы с фиксированными границами корзин: observe() - bisect по
+границам и инкремент счетчика, без блокировок (код выполняется в event loop).
+Агрегация и форматирование для /metrics выполняются только при запросе.
+"""
+import bisect
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Границы корзин латентности, секунды (как у клиентов Prometheus по умолчанию)
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Гистограмма: счетчики по корзинам, сумма и количество наблюдений"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)  # последняя - +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """Накопленные счетчики (значение <= границы), последний - +Inf"""
+        result, total = [], 0
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе корзины"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, total in zip(self.buckets + (float("inf"),), self.cumulative()):
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+class RequestMetrics:
+    """Латентность и объем ответов по маршрутам (шаблон пути + метод)"""
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.cpu_seconds: Dict[Tuple[str, str], float] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.bytes_sent: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, method: str, route: str, status: int, wall: float, cpu: float, size: int):
+        key = (method, route)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram()
+        histogram.observe(wall)
+        self.cpu_seconds[key] = self.cpu_seconds.get(key, 0.0) + cpu
+        self.bytes_sent[key] = self.bytes_sent.get(key, 0) + size
+        status_key = (method, route, status)
+        self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+
+request_metrics = RequestMetrics()
+
+# Ожидание соединения из пула SQLAlchemy (заполняется InstrumentedPool)
+pool_wait = Histogram(buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0))
+
+
+# ============= Prometheus text format =============
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class PrometheusWriter:
+    """Сборка ответа /metrics в текстовом формате Prometheus 0.0.4"""
+
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str, samples: Iterable[Tuple[Optional[Dict[str, str]], float]]):
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self._lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name: str, help_text: str, histograms: Iterable[Tuple[Optional[Dict[str, str]], Histogram]]):
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in histograms:
+            labels = labels or {}
+            for bound, total in zip(histogram.buckets + (float("inf"),), histogram.cumulative()):
+                self._lines.append(f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {total}")
+            self._lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+            self._lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def merge_histograms(histograms: Iterable[Histogram]) -> Histogram:
+    """Сумма гистограмм с одинаковыми границами"""
+    merged = Histogram()
+    for histogram in histograms:
+        merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+        merged.sum += histogram.sum
+        merged.count += histogram.count
+    return merged
@@ -0,0 +1,91 @@
+"""
+Хранилище профилей запросов (кольцевой буфер на диске)
+
+Каждый профиль - файл pstats (cProfile) и JSON с описанием запроса.
+При превышении PROFILE_RING_SIZE удаляются самые старые профили.
+Методы блокирующие: из event loop вызываются через asyncio.to_thread.
+"""
+import io
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ProfileStore:
+    """Профили в каталоге PROFILE_DIR"""
+
+    def __init__(self, directory: str = settings.PROFILE_DIR, size: int = settings.PROFILE_RING_SIZE):
+        self.directory = directory
+        self.size = size
+
+    def _path(self, profile_id: str, extension: str) -> Optional[str]:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def save(self, profiler, meta: Dict[str, Any], profile_id: Optional[str] = None) -> str:
+        """Сохранение профиля и удаление вышедших за размер кольца"""
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = profile_id or self.new_id()
+        profiler.dump_stats(self._path(profile_id, "pstats"))
+        with open(self._path(profile_id, "json"), "w", encoding="utf-8") as f:
+            json.dump({"id": profile_id, "created_at": time.time(), **meta}, f, ensure_ascii=False)
+        self._trim()
+        return profile_id
+
+    def _trim(self):
+        metas = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in metas[:max(len(metas) - self.size, 0)]:
+            profile_id = entry.name[:-len(".json")]
+            for extension in ("json", "pstats"):
+                try:
+                    os.remove(self._path(profile_id, extension))
+                except (OSError, TypeError):
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Описания профилей, новые первыми"""
+        if not os.path.isdir(self.directory):
+            return []
+        result = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    result.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(result, key=lambda meta: meta.get("created_at", 0), reverse=True)
+
+    def pstats_path(self, profile_id: str) -> Optional[str]:
+        path = self._path(profile_id, "pstats")
+        return path if path and os.path.exists(path) else None
+
+    def report(self, profile_id: str, sort: str = "cumulative", limit: int = 50) -> Optional[str]:
+        """Текстовый отчет pstats (top функций)"""
+        path = self.pstats_path(profile_id)
+        if path is None:
+            return None
+        output = io.StringIO()
+        stats = pstats.Stats(path, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+
+profile_store = ProfileStore()
@@ -0,0 +1,206 @@
+"""
+Ограничение частоты попыток (sliding window)
+
+Скользящее окно аппроксимируется двумя соседними фиксированными окнами:
+оценка = попытки в прошлом окне * доля его перекрытия + попытки в текущем.
+На ключ хранятся три числа, поэтому память ограничена числом ключей, а не
+числом попыток.
+
+Backend выбирается настройкой RATE_LIMIT_BACKEND:
+- memory - шардированные LRU таблицы в памяти воркера;
+- postgres - общие счетчики в rate_limit_counters (все воркеры видят одни
+  и те же попытки). При ошибке БД используется память воркера.
+"""
+import logging
+import math
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.models.rate_limit import RateLimitCounter
+
+logger = logging.getLogger(__name__)
+
+
+def _window_position(window: float, now: Optional[float] = None) -> Tuple[int, float]:
+    """Номер текущего окна и прошедшая доля окна"""
+    now = time.time() if now is None else now
+    index = int(now // window)
+    return index, (now - index * window) / window
+
+
+def _weighted(previous: int, current: int, elapsed: float) -> float:
+    return previous * (1.0 - elapsed) + current
+
+
+# Не больше стольких устаревших записей вычищается за один вызов
+SWEEP_BATCH = 8
+
+
+class RateLimitBackend(ABC):
+    """Интерфейс хранилища счетчиков"""
+
+    @abstractmethod
+    async def hit(self, key: str, window: float) -> float:
+        """Учет попытки; возвращает оценку числа попыток в скользящем окне"""
+
+    @abstractmethod
+    async def reset(self, key: str, window: float):
+        """Сброс счетчика (например, после успешного входа)"""
+
+
+class MemoryBackend(RateLimitBackend):
+    """
+    Счетчики в памяти воркера
+
+    Ключи распределены по шардам; каждый шард - LRU с ограничением размера.
+    Запись хранит момент, когда она перестает влиять на оценку (начало
+    окна через одно после последней попытки). Шард упорядочен по последней
+    попытке, поэтому устаревшие записи - в его начале: за вызов из начала
+    очередного шарда снимается не больше SWEEP_BATCH записей.
+    """
+
+    def __init__(self, max_keys: int = settings.RATE_LIMIT_MAX_KEYS, shards: int = settings.RATE_LIMIT_SHARDS):
+        self._shards: List[OrderedDict] = [OrderedDict() for _ in range(shards)]
+        self._shard_size = max(max_keys // shards, 1)
+        self._sweep_position = 0
+        self.evicted = 0
+
+    def _shard(self, key: str) -> OrderedDict:
+        return self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+
+    def _sweep(self, now: float):
+        shard = self._shards[self._sweep_position]
+        self._sweep_position = (self._sweep_position + 1) % len(self._shards)
+        for _ in range(SWEEP_BATCH):
+            if not shard:
+                break
+            _, _, _, expires = next(iter(shard.values()))
+            if expires > now:
+                break
+            shard.popitem(last=False)
+
+    def hit_sync(self, key: str, window: float, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        index, elapsed = _window_position(window, now)
+        shard = self._shard(key)
+        entry = shard.pop(key, None)
+
+        if entry is None or entry[0] < index - 1:
+            previous, current = 0, 0
+        elif entry[0] == index - 1:
+            previous, current = entry[2], 0
+        else:
+            previous, current = entry[1], entry[2]
+        current += 1
+
+        shard[key] = (index, previous, current, (index + 2) * window)
+        if len(shard) > self._shard_size:
+            shard.popitem(last=False)
+            self.evicted += 1
+        self._sweep(now)
+        return _weighted(previous, current, elapsed)
+
+    async def hit(self, key: str, window: float) -> float:
+        return self.hit_sync(key, window)
+
+    async def reset(self, key: str, window: float):
+        self._shard(key).pop(key, None)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+class PostgresBackend(RateLimitBackend):
+    """Общие для воркеров счетчики в таблице rate_limit_counters"""
+
+    PURGE_INTERVAL = 60.0  # секунды между удалениями устаревших строк
+
+    def __init__(self, session_factory=AsyncSessionLocal, fallback: Optional[MemoryBackend] = None):
+        self._session_factory = session_factory
+        self._fallback = fallback or MemoryBackend()
+        self._last_purge = 0.0
+        self.errors = 0
+
+    async def hit(self, key: str, window: float) -> float:
+        index, elapsed = _window_position(window)
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=window * 2)
+        try:
+            async with self._session_factory() as session:
+                stmt = pg_insert(RateLimitCounter).values(
+                    key=key, window_index=index, count=1, expires_at=expires_at
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[RateLimitCounter.key, RateLimitCounter.window_index],
+                    set_={"count": RateLimitCounter.count + 1},
+                ).returning(RateLimitCounter.count)
+                current = (await session.execute(stmt)).scalar_one()
+                previous = (await session.execute(
+                    select(RateLimitCounter.count).where(
+                        RateLimitCounter.key == key,
+                        RateLimitCounter.window_index == index - 1,
+                    )
+                )).scalar_one_or_none() or 0
+
+                if time.monotonic() - self._last_purge > self.PURGE_INTERVAL:
+                    self._last_purge = time.monotonic()
+                    await session.execute(
+                        delete(RateLimitCounter).where(RateLimitCounter.expires_at < datetime.now(timezone.utc))
+                    )
+                await session.commit()
+            return _weighted(previous, current, elapsed)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Rate limit backend error, using local counters: {e}")
+            return await self._fallback.hit(key, window)
+
+    async def reset(self, key: str, window: float):
+        await self._fallback.reset(key, window)
+        try:
+            async with self._session_factory() as session:
+                await session.execute(delete(RateLimitCounter).where(RateLimitCounter.key == key))
+                await session.commit()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Rate limit reset failed: {e}")
+
+
+class RateLimiter:
+    """Проверка лимитов для набора ключей"""
+
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+        self.rejected = 0
+
+    async def hit(self, key: str, limit: int, window: float) -> Optional[int]:
+        """
+        Учет попытки по ключу
+        Возвращает None, если лимит не превышен, иначе секунды до повтора
+        """
+        count = await self.backend.hit(key, window)
+        if count <= limit:
+            return None
+        self.rejected += 1
+        _, elapsed = _window_position(window)
+        return max(math.ceil(window * (1.0 - elapsed)), 1)
+
+    async def reset(self, key: str, window: float):
+        await self.backend.reset(key, window)
+
+
+def create_backend(name: str = settings.RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    if name == "postgres":
+        return PostgresBackend()
+    if name != "memory":
+        logger.warning(f"Unknown RATE_LIMIT_BACKEND '{name}', using memory")
+    return MemoryBackend()
+
+
+rate_limiter = RateLimiter(create_backend())
@@ -0,0 +1,459 @@
+"""
+Полнотекстовый поиск по каталогу (инвертированный индекс в памяти воркера)
+
+Индексируются название, категория и описание товара (с весами полей).
+Слова приводятся к основе стеммером Snowball для русского языка, латиница
+и числа индексируются как есть. Ранжирование - BM25. Последнее слово
+запроса (если после него нет пробела) ищется и по префиксу - для подсказок
+при наборе. Все слова запроса должны совпасть (AND).
+
+Индекс подписан на изменения каталога (app.core.catalog) и обновляется
+инкрементально. При SEARCH_BACKEND=postgres индекс в памяти не строится,
+а поиск идет по GIN индексу tsvector в таблице products.
+"""
+import heapq
+import logging
+import math
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.catalog import CatalogItem, catalog
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[0-9a-zа-яё]+")
+
+STOPWORDS = frozenset("""
+    а без более бы был была были было быть в вам вас весь во вот все всего всех вы где да даже для до
+    его ее если есть еще же за здесь и из или им их к как ко когда кто ли либо мне может мы на над
+    надо наш не него нее нет ни них но ну о об однако он она они оно от очень по под при с со так
+    также такой там те тем то того тоже той только том ты у уже хотя чего чей чем что чтобы чье чья
+    эта эти это я
+""".split())
+
+# Веса полей: совпадение в названии важнее, чем в описании
+FIELD_WEIGHTS = (("name", 3.0), ("category", 2.0), ("description", 1.0))
+
+# Совпадение только по префиксу ранжируется ниже точного совпадения основы
+PREFIX_WEIGHT = 0.8
+
+# Документов на шаг чтения постингов в Threshold Algorithm
+TA_BLOCK = 32
+
+
+# --- Стеммер Snowball (русский) ---
+
+VOWELS = frozenset("аеиоуыэюя")
+
+PERFECTIVE_GERUND_1 = ("вшись", "вши", "в")  # после а/я
+PERFECTIVE_GERUND_2 = ("ившись", "ывшись", "ивши", "ывши", "ив", "ыв")
+REFLEXIVE = ("ся", "сь")
+ADJECTIVE = (
+    "ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый",
+    "ой", "ем", "им", "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+PARTICIPLE_1 = ("ем", "нн", "вш", "ющ", "щ")  # после а/я
+PARTICIPLE_2 = ("ивш", "ывш", "ующ")
+VERB_1 = ("ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н")  # после а/я
+VERB_2 = (
+    "ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют",
+    "ены", "ить", "ыть", "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю",
+)
+NOUN = (
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях", "ев", "ов", "ие", "ье", "еи", "ии", "ей",
+    "ой", "ий", "ям", "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья",
+    "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+)
+SUPERLATIVE = ("ейше", "ейш")
+DERIVATIONAL = ("ость", "ост")
+
+
+def _strip(word: str, start: int, after_a: Tuple[str, ...] = (), plain: Tuple[str, ...] = ()) -> Optional[str]:
+    """
+    Удаление самого длинного окончания внутри региона word[start:]
+    Окончания after_a допустимы только после "а"/"я" (буква остается)
+    """
+    region = word[start:]
+    best = 0
+    for suffix in plain:
+        if len(suffix) > best and region.endswith(suffix):
+            best = len(suffix)
+    for suffix in after_a:
+        if len(suffix) > best and region.endswith(suffix) and region[-len(suffix) - 1:-len(suffix)] in ("а", "я"):
+            best = len(suffix)
+    return word[:-best] if best else None
+
+
+def _region_after_consonant(word: str, start: int) -> int:
+    """Начало региона после первой согласной, следующей за гласной (R1/R2)"""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+@lru_cache(maxsize=100000)
+def stem(word: str) -> str:
+    """Основа русского слова (алгоритм Snowball Russian)"""
+    word = word.replace("ё", "е")
+    rv = next((i + 1 for i, char in enumerate(word) if char in VOWELS), len(word))
+    if rv >= len(word):
+        return word
+    r2 = _region_after_consonant(word, _region_after_consonant(word, 0))
+
+    # Шаг 1: деепричастие, иначе возвратность + прилагательное/причастие, глагол или существительное
+    result = _strip(word, rv, PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+    if result is None:
+        word = _strip(word, rv, plain=REFLEXIVE) or word
+        result = _strip(word, rv, plain=ADJECTIVE)
+        if result is not None:
+            result = _strip(result, rv, PARTICIPLE_1, PARTICIPLE_2) or result
+        else:
+            result = _strip(word, rv, VERB_1, VERB_2) or _strip(word, rv, plain=NOUN)
+    word = result or word
+
+    # Шаг 2
+    if word[rv:].endswith("и"):
+        word = word[:-1]
+
+    # Шаг 3: словообразовательные окончания в R2
+    word = _strip(word, r2, plain=DERIVATIONAL) or word
+
+    # Шаг 4: "нн" -> "н", превосходная степень, мягкий знак
+    if word[rv:].endswith("нн"):
+        word = word[:-1]
+    else:
+        superlative = _strip(word, rv, plain=SUPERLATIVE)
+        if superlative is not None:
+            word = superlative[:-1] if superlative[rv:].endswith("нн") else superlative
+        elif word[rv:].endswith("ь"):
+            word = word[:-1]
+    return word
+
+
+def normalize_token(token: str) -> str:
+    return token.replace("ё", "е")
+
+
+def tokenize(value: str) -> List[str]:
+    """Слова без стоп-слов, в нижнем регистре, ё -> е"""
+    return [normalize_token(token) for token in TOKEN_RE.findall(value.lower()) if token not in STOPWORDS]
+
+
+def term(token: str) -> str:
+    """Термин индекса: основа для кириллицы, слово как есть для латиницы и чисел"""
+    return stem(token) if "а" <= token[0] <= "я" else token
+
+
+class SearchIndex:
+    """Инвертированный индекс с ранжированием BM25"""
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        prefix_max_terms: int = settings.SEARCH_PREFIX_MAX_TERMS,
+        min_prefix: int = settings.SEARCH_MIN_PREFIX,
+        results_cache_size: int = settings.SEARCH_CACHE_SIZE,
+    ):
+        self.k1 = k1
+        self.b = b
+        self._prefix_max_terms = prefix_max_terms
+        self._min_prefix = min_prefix
+
+        self._postings: Dict[str, Dict[int, float]] = {}  # термин -> {id товара: взвешенная частота}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_len: Dict[int, float] = {}
+        self._total_len = 0.0
+        self._posting_count = 0
+        self._terms: List[str] = []  # словарь по алфавиту (поиск по префиксу)
+        # Постинги, упорядоченные по вкладу термина в BM25 (строятся лениво)
+        self._ranked: Dict[str, Tuple[List[int], List[float]]] = {}
+        # Результаты запросов до следующего обновления (подсказки при наборе повторяются)
+        self._results = TTLCache(maxsize=results_cache_size, ttl=float("inf"))
+
+        # Метрики
+        self.queries = 0
+        self.updates = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def update(self, items: List[CatalogItem], removed: List[int]):
+        """Инкрементальное обновление (слушатель изменений каталога)"""
+        new_terms: Set[str] = set()
+        dropped_terms: Set[str] = set()
+        for product_id in removed:
+            dropped_terms |= self._remove(product_id)
+        for item in items:
+            dropped_terms |= self._remove(item.id)
+            new_terms |= self._add(item)
+        # Термин мог опустеть и снова появиться в одном обновлении
+        dropped_terms = {value for value in dropped_terms if value not in self._postings}
+        new_terms = {value for value in new_terms if value in self._postings}
+
+        if len(new_terms) + len(dropped_terms) > 64:
+            self._terms = sorted(self._postings)
+        else:
+            for value in dropped_terms:
+                position = bisect_left(self._terms, value)
+                if position < len(self._terms) and self._terms[position] == value:
+                    del self._terms[position]
+            for value in new_terms:
+                position = bisect_left(self._terms, value)
+                if position == len(self._terms) or self._terms[position] != value:
+                    self._terms.insert(position, value)
+
+        # Порядок постингов зависит от N и средней длины документа
+        self._ranked.clear()
+        self._results.clear()
+        self.updates += 1
+
+    def _add(self, item: CatalogItem) -> Set[str]:
+        """Индексация товара; возвращает термины, которых не было в словаре"""
+        frequencies: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(getattr(item, field) or ""):
+                value = term(token)
+                frequencies[value] = frequencies.get(value, 0.0) + weight
+        created = set()
+        for value, frequency in frequencies.items():
+            posting = self._postings.get(value)
+            if posting is None:
+                posting = self._postings[value] = {}
+                created.add(value)
+            posting[item.id] = frequency
+        length = sum(frequencies.values())
+        self._doc_terms[item.id] = frequencies
+        self._posting_count += len(frequencies)
+        self._doc_len[item.id] = length
+        self._total_len += length
+        return created
+
+    def _remove(self, product_id: int) -> Set[str]:
+        """Удаление товара из индекса; возвращает опустевшие термины"""
+        frequencies = self._doc_terms.pop(product_id, None)
+        if frequencies is None:
+            return set()
+        self._total_len -= self._doc_len.pop(product_id)
+        self._posting_count -= len(frequencies)
+        emptied = set()
+        for value in frequencies:
+            posting = self._postings[value]
+            del posting[product_id]
+            if not posting:
+                del self._postings[value]
+                emptied.add(value)
+        return emptied
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        position = bisect_left(self._terms, prefix)
+        expanded = []
+        while (
+            position < len(self._terms)
+            and len(expanded) < self._prefix_max_terms
+            and self._terms[position].startswith(prefix)
+        ):
+            expanded.append(self._terms[position])
+            position += 1
+        return expanded
+
+    def _query_groups(self, query: str) -> List[Dict[str, float]]:
+        """Для каждого слова запроса - термины индекса с весами; пустой список - нет совпадений"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        typing = not query[-1:].isspace()
+        groups = []
+        for index, token in enumerate(tokens):
+            group: Dict[str, float] = {}
+            exact = term(token)
+            if exact in self._postings:
+                group[exact] = 1.0
+            if typing and index == len(tokens) - 1 and len(token) >= self._min_prefix:
+                for value in self._expand_prefix(token):
+                    group.setdefault(value, PREFIX_WEIGHT)
+            if not group:
+                return []
+            groups.append(group)
+        return groups
+
+    def _term_scorer(self, value: str):
+        """Функция id товара -> вклад термина в BM25"""
+        posting = self._postings[value]
+        count = len(self._doc_len)
+        idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+        avgdl = self._total_len / count
+        k1, b, doc_len = self.k1, self.b, self._doc_len
+
+        def score(product_id: int) -> float:
+            frequency = posting.get(product_id)
+            if frequency is None:
+                return 0.0
+            return idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * doc_len[product_id] / avgdl))
+        return score
+
+    def _group_scorer(self, group: Dict[str, float]):
+        """Вклад слова запроса: лучший из его терминов (точная основа или префикс)"""
+        scorers = [(self._term_scorer(value), weight) for value, weight in group.items()]
+        if len(scorers) == 1 and scorers[0][1] == 1.0:
+            return scorers[0][0]
+        return lambda product_id: max(scorer(product_id) * weight for scorer, weight in scorers)
+
+    def _ranked_posting(self, value: str) -> Tuple[List[int], List[float]]:
+        """id товаров по убыванию вклада термина и сами вклады"""
+        ranked = self._ranked.get(value)
+        if ranked is None:
+            score = self._term_scorer(value)
+            scored = sorted((-score(product_id), product_id) for product_id in self._postings[value])
+            ranked = self._ranked[value] = ([product_id for _, product_id in scored], [-negative for negative, _ in scored])
+        return ranked
+
+    def search(self, query: str, limit: int = 20, offset: int = 0, use_cache: bool = True) -> List[Tuple[int, float]]:
+        """(id товара, релевантность), лучшие первыми"""
+        self.queries += 1
+        cache_key = (" ".join(tokenize(query)), not query[-1:].isspace(), limit, offset)
+        if use_cache:
+            cached = self._results.get(cache_key)
+            if cached is not None:
+                return cached
+        result = self._search(query, limit, offset)
+        self._results.set(cache_key, result)
+        return result
+
+    def _search(self, query: str, limit: int, offset: int) -> List[Tuple[int, float]]:
+        groups = self._query_groups(query)
+        if not groups:
+            return []
+        needed = offset + limit
+        sizes = [sum(len(self._postings[value]) for value in group) for group in groups]
+        # Самое редкое слово первым: несовпадение (AND) отсекается раньше
+        group_scorers = [self._group_scorer(groups[i]) for i in sorted(range(len(groups)), key=sizes.__getitem__)]
+
+        def score(product_id: int) -> Optional[float]:
+            """Сумма по словам запроса; None - совпали не все слова"""
+            total = 0.0
+            for group_scorer in group_scorers:
+                best = group_scorer(product_id)
+                if not best:
+                    return None
+                total += best
+            return total
+
+        if len(groups) > 1 and min(sizes) <= settings.SEARCH_SCAN_THRESHOLD:
+            # Редкое слово: полный перебор его документов
+            base = groups[sizes.index(min(sizes))]
+            candidates = set()
+            for value in base:
+                candidates.update(self._postings[value])
+            scored = []
+            for product_id in candidates:
+                total = score(product_id)
+                if total is not None:
+                    scored.append((total, -product_id))
+            top = heapq.nlargest(needed, scored)
+        else:
+            top = self._top_threshold(groups, score, needed)
+
+        return [(-negative_id, total) for total, negative_id in top[offset:]]
+
+    def _top_threshold(self, groups: List[Dict[str, float]], score, needed: int) -> List[Tuple[float, int]]:
+        """
+        Top-k по постингам, упорядоченным по вкладу (Threshold Algorithm)
+
+        Списки читаются параллельно по глубине. Документ, еще не встреченный
+        ни в одном списке, набирает не больше суммы вкладов на достигнутой глубине,
+        поэтому перебор останавливается, как только k-й результат не хуже этой
+        границы - обычно задолго до конца постингов частых слов.
+        """
+        lists = [
+            [(self._ranked_posting(value), weight) for value, weight in group.items()]
+            for group in groups
+        ]
+        longest = max(len(ids) for group in lists for (ids, scores), weight in group)
+        seen: Set[int] = set()
+        top: List[Tuple[float, int]] = []  # min-heap (релевантность, -id)
+        # Списки читаются блоками: граница проверяется по последнему элементу блока
+        for start in range(0, longest, TA_BLOCK):
+            end = start + TA_BLOCK
+            threshold = 0.0
+            exhausted = False
+            for group in lists:
+                bound = 0.0
+                exhausted = exhausted or all(start >= len(ids) for (ids, scores), weight in group)
+                for (ids, scores), weight in group:
+                    if start >= len(ids):
+                        continue
+                    bound = max(bound, scores[min(end, len(ids)) - 1] * weight)
+                    block = [product_id for product_id in ids[start:end] if product_id not in seen]
+                    seen.update(block)
+                    for product_id in block:
+                        total = score(product_id)
+                        if total is None:
+                            continue
+                        if len(top) < needed:
+                            heapq.heappush(top, (total, -product_id))
+                        elif (total, -product_id) > top[0]:
+                            heapq.heapreplace(top, (total, -product_id))
+                threshold += bound
+            # Все постинги одного из слов прочитаны: новых совпадений (AND) не будет
+            if exhausted:
+                break
+            # Допуск: суммы вкладов складываются в разном порядке
+            if len(top) >= needed and top[0][0] >= threshold - 1e-9:
+                break
+        return sorted(top, reverse=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self._doc_len),
+            "terms": len(self._postings),
+            "postings": self._posting_count,
+            "queries": self.queries,
+            "cache_hits": self._results.hits,
+            "updates": self.updates,
+        }
+
+
+# --- Поиск в PostgreSQL (SEARCH_BACKEND=postgres) ---
+
+# Выражение должно совпадать с GIN индексом ix_products_search (миграция c4a7e1f9b2d3)
+SEARCH_VECTOR_SQL = "to_tsvector('russian', name || ' ' || category || ' ' || description)"
+
+
+def build_tsquery(query: str) -> str:
+    """to_tsquery из слов запроса (только [0-9a-zа-я], экранирование не требуется)"""
+    tokens = tokenize(query)
+    if not tokens:
+        return ""
+    if not query[-1:].isspace():
+        tokens[-1] += ":*"
+    return " & ".join(tokens)
+
+
+async def search_postgres(db: AsyncSession, query: str, limit: int = 20, offset: int = 0) -> List[int]:
+    """id товаров по релевантности (ts_rank_cd)"""
+    tsquery = build_tsquery(query)
+    if not tsquery:
+        return []
+    result = await db.execute(
+        text(f"""
+            SELECT id FROM products
+            WHERE is_active AND {SEARCH_VECTOR_SQL} @@ to_tsquery('russian', :query)
+            ORDER BY ts_rank_cd({SEARCH_VECTOR_SQL}, to_tsquery('russian', :query)) DESC, id
+            LIMIT :limit OFFSET :offset
+        """),
+        {"query": tsquery, "limit": limit, "offset": offset},
+    )
+    return [row[0] for row in result]
+
+
+search_index = SearchIndex()
+if settings.SEARCH_BACKEND == "memory":
+    catalog.on_change(search_index.update)
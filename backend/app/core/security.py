@@ -5,8 +5,13 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 from jose import jwt, JWTError
 from passlib.context import CryptContext
+from .cache import TTLCache
 from .config import settings
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import hashlib
 import re
+import time
 import secrets
 
 # Контекст для хэширования паролей
@@ -23,6 +28,118 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class HashingOverloaded(Exception):
+    """Очередь хэширования переполнена (обрабатывается как 503 + Retry-After)"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing queue is saturated")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    Выполнение bcrypt вне event loop в ограниченном пуле потоков
+
+    bcrypt освобождает GIL, поэтому потоки дают реальный параллелизм без
+    накладных расходов процессов. Число одновременно ожидающих операций
+    ограничено: при переполнении запрос сразу отклоняется, а не копит
+    задержку для всех остальных.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.HASHING_WORKERS,
+        max_queue: int = settings.HASHING_MAX_QUEUE,
+        retry_after: int = settings.HASHING_RETRY_AFTER,
+    ):
+        self._workers = workers
+        self._max_queue = max_queue
+        self._retry_after = retry_after
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+
+        # Метрики
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0  # сняты из очереди до начала выполнения
+        self.rejected = 0
+        self.max_queue_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Операции, ожидающие свободного потока"""
+        return max(self._in_flight - self._workers, 0)
+
+    async def _submit(self, func, *args):
+        if self._in_flight >= self._workers + self._max_queue:
+            self.rejected += 1
+            raise HashingOverloaded(self._retry_after)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="bcrypt")
+
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(func, *args)
+        self._in_flight += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        # Операция занимает слот, пока ее выполняет поток, даже если запрос
+        # отменен (поток не прервать), поэтому учет - по завершении future
+        future.add_done_callback(lambda done: self._call_in_loop(loop, self._finished, done))
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    def _call_in_loop(loop: asyncio.AbstractEventLoop, callback, *args):
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # Event loop уже закрыт (остановка воркера)
+
+    def _finished(self, future: Future):
+        self._in_flight -= 1
+        if future.cancelled():
+            self.cancelled += 1
+        elif future.exception() is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        """Остановка пула (вызывается из lifespan)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self._workers,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+        }
+
+
+password_hasher = PasswordHasher()
+
+
+async def hash_password_async(password: str) -> str:
+    """Хэширование пароля без блокировки event loop"""
+    return await password_hasher.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Проверка пароля без блокировки event loop"""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
 def validate_password_strength(password: str) -> tuple[bool, str]:
     """
     Проверка надежности пароля согласно требованиям ТЗ:
@@ -78,13 +195,33 @@ def create_refresh_token(data: Dict[str, Any]) -> str:
     return encoded_jwt
 
 
-def decode_token(token: str) -> Optional[Dict[str, Any]]:
-    """Декодирование JWT токена"""
+# Кэш проверенных токенов: ключ - SHA-256 токена (сам токен в памяти не храним),
+# запись живет не дольше exp, поэтому истекший токен снова проходит jwt.decode
+token_cache = TTLCache(maxsize=max(settings.TOKEN_CACHE_SIZE, 1), ttl=settings.TOKEN_CACHE_TTL)
+
+
+def decode_token(token: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+    """Декодирование JWT токена (повторные токены - без криптографической проверки)"""
+    use_cache = use_cache and settings.TOKEN_CACHE_SIZE > 0
+    if use_cache:
+        key = hashlib.sha256(token.encode()).digest()
+        payload = token_cache.get(key)
+        if payload is not None:
+            return dict(payload)
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
+    
+    if use_cache:
+        ttl = settings.TOKEN_CACHE_TTL
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            ttl = min(ttl, exp - time.time())
+        if ttl > 0:
+            token_cache.set(key, dict(payload), ttl=ttl)
+    return payload
 
 
 def verify_token(token: str, token_type: str = "access") -> Optional[Dict[str, Any]]:
@@ -0,0 +1,150 @@
+"""
+Счетчики просмотров каталога
+
+Вместо строки audit_log на каждый просмотр счетчики накапливаются в памяти
+по ключу (минута, product_id, категория, подсеть IP) и периодически
+сбрасываются в product_view_stats одним UPSERT.
+"""
+import asyncio
+import ipaddress
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.db.models.product_view_stat import ProductViewStat
+
+logger = logging.getLogger(__name__)
+
+FLUSH_CHUNK_ROWS = 5000
+
+
+def ip_bucket(ip_address: Optional[str]) -> str:
+    """Подсеть клиента: /24 для IPv4, /48 для IPv6 (адрес целиком не храним)"""
+    if not ip_address:
+        return ""
+    try:
+        address = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return ""
+    prefix = 24 if address.version == 4 else 48
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+class ViewCounter:
+    """Накопитель счетчиков просмотров с периодическим сбросом в БД"""
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        flush_interval: float = settings.PRODUCT_VIEW_FLUSH_INTERVAL,
+        max_keys: int = settings.PRODUCT_VIEW_MAX_KEYS,
+    ):
+        self._session_factory = session_factory
+        self._flush_interval = flush_interval
+        self._max_keys = max_keys
+        self._counts: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_needed: Optional[asyncio.Event] = None
+        self._stopping = False
+
+        # Метрики
+        self.recorded = 0
+        self.flushed = 0
+        self.failed = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Запуск периодического сброса (вызывается из lifespan)"""
+        if self.running:
+            return
+        self._flush_needed = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="product-view-counter")
+
+    async def stop(self):
+        """Остановка с финальным сбросом накопленного"""
+        if not self.running:
+            return
+        self._stopping = True
+        self._flush_needed.set()
+        await self._task
+        self._task = None
+        await self.flush()
+
+    def record(self, product_id: Optional[int] = None, category: Optional[str] = None, ip_address: Optional[str] = None):
+        """Учет одного просмотра (без обращения к БД)"""
+        now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        key = (now, product_id or 0, (category or "").lower()[:100], ip_bucket(ip_address))
+        self._counts[key] += 1
+        self.recorded += 1
+        if len(self._counts) >= self._max_keys and self._flush_needed is not None:
+            self._flush_needed.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Сброс накопленных счетчиков в product_view_stats"""
+        if not self._counts:
+            return
+        counts, self._counts = self._counts, Counter()
+        started = time.perf_counter()
+        rows = [
+            {"minute": minute, "product_id": product_id, "category": category, "ip_bucket": bucket, "count": count}
+            for (minute, product_id, category, bucket), count in sorted(counts.items())
+        ]
+        try:
+            async with self._session_factory() as session:
+                # Порциями: ограничение asyncpg на число параметров запроса
+                for start in range(0, len(rows), FLUSH_CHUNK_ROWS):
+                    stmt = pg_insert(ProductViewStat).values(rows[start:start + FLUSH_CHUNK_ROWS])
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[
+                            ProductViewStat.minute,
+                            ProductViewStat.product_id,
+                            ProductViewStat.category,
+                            ProductViewStat.ip_bucket,
+                        ],
+                        set_={"count": ProductViewStat.count + stmt.excluded.count},
+                    )
+                    await session.execute(stmt)
+                await session.commit()
+            self.flushed += sum(counts.values())
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Error flushing product view counters ({len(rows)} keys): {e}")
+            # Возвращаем счетчики для следующей попытки, но не растем без предела
+            self._counts.update(counts)
+            if len(self._counts) > self._max_keys * 2:
+                logger.error(f"Dropping {len(self._counts)} pending product view counters")
+                self._counts.clear()
+        finally:
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "pending_keys": len(self._counts),
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "failed_flushes": self.failed,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+        }
+
+
+view_counter = ViewCounter()
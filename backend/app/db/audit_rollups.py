@@ -0,0 +1,199 @@
+"""
+Инкрементальное обновление агрегатов журнала аудита и сводка по ним
+
+Агрегаты обновляются в той же транзакции, что и запись событий, поэтому
+всегда согласованы с audit_log. Сводка за период собирается из посуточных
+агрегатов для полных суток, почасовых - для полных часов на краях периода
+и сырой таблицы - только для неполных часов на границах.
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, func, and_, union_all, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models.audit_log import AuditLog
+from app.db.models.audit_rollup import AuditLogHourly, AuditLogDaily
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Наивные datetime считаются UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value: datetime) -> datetime:
+    floored = floor_hour(value)
+    return floored if floored == value else floored + HOUR
+
+
+def ceil_day(value: datetime) -> datetime:
+    floored = floor_day(value)
+    return floored if floored == value else floored + DAY
+
+
+async def apply_rollups(session: AsyncSession, entries: Iterable[Dict[str, Any]]):
+    """
+    Увеличение счетчиков агрегатов для пакета событий (без commit)
+    """
+    hourly: Counter = Counter()
+    daily: Counter = Counter()
+    for entry in entries:
+        timestamp = _as_utc(entry.get("timestamp") or datetime.now(timezone.utc))
+        key = (entry["operation"], entry["status"], entry.get("username") or "")
+        hourly[(floor_hour(timestamp),) + key] += 1
+        daily[(floor_day(timestamp),) + key] += 1
+
+    for model, counts in ((AuditLogHourly, hourly), (AuditLogDaily, daily)):
+        if not counts:
+            continue
+        # Сортировка ключей - одинаковый порядок блокировок строк между воркерами
+        rows = [
+            {"bucket": bucket, "operation": operation, "status": status, "username": username, "count": count}
+            for (bucket, operation, status, username), count in sorted(
+                counts.items(), key=lambda item: (item[0][0], item[0][1].value, item[0][2].value, item[0][3])
+            )
+        ]
+        stmt = pg_insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.bucket, model.operation, model.status, model.username],
+            set_={"count": model.count + stmt.excluded.count},
+        )
+        await session.execute(stmt)
+
+
+def split_range(
+    start: Optional[datetime], end: Optional[datetime]
+) -> Tuple[List[Tuple], List[Tuple], List[Tuple]]:
+    """
+    Разбиение полуинтервала [start, end) на части по источникам
+
+    Returns:
+        (raw, hourly, daily) - списки полуинтервалов (from, to), None - без границы
+    """
+    raw, hourly, daily = [], [], []
+
+    hour_start = ceil_hour(start) if start else None
+    hour_end = floor_hour(end) if end else None
+
+    if hour_start and hour_end and hour_start >= hour_end:
+        return [(start, end)], [], []
+
+    if start and start < hour_start:
+        raw.append((start, hour_start))
+    if end and hour_end < end:
+        raw.append((hour_end, end))
+
+    day_start = ceil_day(hour_start) if hour_start else None
+    day_end = floor_day(hour_end) if hour_end else None
+
+    if day_start and day_end and day_start >= day_end:
+        hourly.append((hour_start, hour_end))
+        return raw, hourly, daily
+
+    daily.append((day_start, day_end))
+    if hour_start and hour_start < day_start:
+        hourly.append((hour_start, day_start))
+    if hour_end and day_end < hour_end:
+        hourly.append((day_end, hour_end))
+
+    return raw, hourly, daily
+
+
+def _range_filters(column, lower: Optional[datetime], upper: Optional[datetime]) -> list:
+    filters = []
+    if lower is not None:
+        filters.append(column >= lower)
+    if upper is not None:
+        filters.append(column < upper)
+    return filters
+
+
+def _sources(start: Optional[datetime], end: Optional[datetime]):
+    """Подзапрос (operation, status, username, cnt) по всем частям периода"""
+    raw, hourly, daily = split_range(start, end)
+    parts = []
+
+    for lower, upper in raw:
+        username = func.coalesce(AuditLog.username, literal_column("''"))
+        parts.append(
+            select(
+                AuditLog.operation,
+                AuditLog.status,
+                username.label("username"),
+                func.count().label("cnt"),
+            )
+            .where(and_(*_range_filters(AuditLog.timestamp, lower, upper)))
+            .group_by(AuditLog.operation, AuditLog.status, username)
+        )
+
+    for model, ranges in ((AuditLogHourly, hourly), (AuditLogDaily, daily)):
+        for lower, upper in ranges:
+            query = select(
+                model.operation,
+                model.status,
+                model.username,
+                model.count.label("cnt"),
+            )
+            filters = _range_filters(model.bucket, lower, upper)
+            if filters:
+                query = query.where(and_(*filters))
+            parts.append(query)
+
+    return union_all(*parts).subquery("src")
+
+
+async def summarize(
+    db: AsyncSession,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    top: int = 10,
+) -> Dict[str, Any]:
+    """
+    Сводка по журналу за период [from_date, to_date] (to_date включительно)
+    """
+    start = _as_utc(from_date) if from_date else None
+    # Переход к полуинтервалу: точность timestamp в PostgreSQL - микросекунды
+    end = _as_utc(to_date) + timedelta(microseconds=1) if to_date else None
+
+    src = _sources(start, end)
+    total_cnt = func.sum(src.c.cnt)
+
+    result = await db.execute(
+        select(src.c.operation, src.c.status, total_cnt.label("count"))
+        .group_by(src.c.operation, src.c.status)
+    )
+    by_status: Counter = Counter()
+    by_operation: Counter = Counter()
+    for row in result:
+        by_status[row.status.value] += int(row.count)
+        by_operation[row.operation.value] += int(row.count)
+
+    result = await db.execute(
+        select(src.c.username, total_cnt.label("count"))
+        .where(src.c.username != "")
+        .group_by(src.c.username)
+        .order_by(total_cnt.desc())
+        .limit(top)
+    )
+    by_user = {row.username: int(row.count) for row in result}
+
+    return {
+        "total_events": sum(by_status.values()),
+        "by_status": dict(by_status),
+        "top_operations": dict(by_operation.most_common(top)),
+        "top_users": by_user,
+    }
@@ -0,0 +1,87 @@
+"""
+Стратегии подсчета общего количества строк для списков с фильтрами
+
+Сначала кэш с коротким TTL по набору фильтров, затем оценка планировщика:
+точное количество считается, только если оценка не больше
+COUNT_EXACT_THRESHOLD. Селективность фильтра по его виду не угадывается -
+ILIKE '%a%' по username может совпасть с большей частью таблицы.
+"""
+from typing import Hashable, Optional, Tuple
+
+from sqlalchemy import select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.explain import estimate_rows
+
+# Кэш результатов подсчета: ключ -> (total, is_estimate)
+count_cache = TTLCache(maxsize=settings.COUNT_CACHE_SIZE, ttl=settings.COUNT_CACHE_TTL)
+
+
+async def cached_or_estimated_count(
+    db: AsyncSession,
+    model,
+    filters: list,
+    cache_key: Optional[Hashable] = None,
+) -> Optional[Tuple[int, bool]]:
+    """
+    Количество из кэша или оценка планировщика без точного подсчета
+
+    Returns:
+        (total, is_estimate) или None, если оценка мала и нужен точный
+        подсчет (его результат сохраняется через remember_count)
+    """
+    if cache_key is not None:
+        cached = count_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # Оценка по плану запроса без его выполнения
+    rows_query = select(model.id)
+    if filters:
+        rows_query = rows_query.where(and_(*filters))
+    estimate = await estimate_rows(db, rows_query)
+    if estimate <= settings.COUNT_EXACT_THRESHOLD:
+        return None
+
+    counted = (estimate, True)
+    if cache_key is not None:
+        count_cache.set(cache_key, counted)
+    return counted
+
+
+async def exact_count(db: AsyncSession, model, filters: list) -> int:
+    """Точный COUNT(*) строк model по фильтрам"""
+    count_query = select(func.count()).select_from(model)
+    if filters:
+        count_query = count_query.where(and_(*filters))
+    return (await db.execute(count_query)).scalar()
+
+
+def remember_count(cache_key: Optional[Hashable], total: int) -> Tuple[int, bool]:
+    """Сохранение точного количества в кэше"""
+    counted = (total, False)
+    if cache_key is not None:
+        count_cache.set(cache_key, counted)
+    return counted
+
+
+async def count_rows(
+    db: AsyncSession,
+    model,
+    filters: list,
+    cache_key: Optional[Hashable] = None,
+) -> Tuple[int, bool]:
+    """
+    Подсчет строк model по фильтрам в сессии запроса отдельным запросом
+
+    Списки, которые и так выбирают страницу, считают точное количество
+    окном в запросе страницы (см. get_logs), а не этой функцией.
+
+    Returns:
+        (total, is_estimate)
+    """
+    counted = await cached_or_estimated_count(db, model, filters, cache_key=cache_key)
+    if counted is not None:
+        return counted
+    return remember_count(cache_key, await exact_count(db, model, filters))
@@ -3,18 +3,36 @@
 """
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from typing import AsyncGenerator
+import time
 from app.core.config import settings
+from app.core.metrics import pool_wait
+from app.db.instrumentation import install_query_instrumentation
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул соединений с учетом времени ожидания соединения (для /metrics)"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - started)
+
 
 # Создание async engine
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=settings.DEBUG,
+    echo=settings.SQL_ECHO,
     future=True,
+    poolclass=InstrumentedPool,
     pool_pre_ping=True,
     pool_size=10,
     max_overflow=20,
 )
+install_query_instrumentation(engine.sync_engine)
 
 # Фабрика сессий
 AsyncSessionLocal = async_sessionmaker(
@@ -44,6 +62,19 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency для публичных маршрутов, которые БД в основном не читают
+    
+    AsyncSession берет соединение из пула только при первом запросе к БД,
+    поэтому обработчик, ответивший из памяти (каталог, кэш ответов), пул не
+    занимает. Коммита нет: при закрытии открытая транзакция откатывается;
+    редкая запись (log_audit_event без фонового писателя) коммитит сама.
+    """
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
 async def init_db():
     """Инициализация базы данных"""
     async with engine.begin() as conn:
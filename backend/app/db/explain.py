@@ -0,0 +1,42 @@
+"""
+EXPLAIN для SQLAlchemy запросов (оценки планировщика, проверка планов)
+"""
+import json
+from typing import Any, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class Explain(Executable, ClauseElement):
+    """Конструкция EXPLAIN (FORMAT JSON) <statement>"""
+    __visit_name__ = "explain"
+    inherit_cache = False
+
+    def __init__(self, statement, analyze: bool = False):
+        self.statement = statement
+        self.analyze = analyze
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    options = "ANALYZE, FORMAT JSON" if element.analyze else "FORMAT JSON"
+    return f"EXPLAIN ({options}) " + compiler.process(element.statement, **kw)
+
+
+async def explain(db: AsyncSession, statement, analyze: bool = False) -> Dict[str, Any]:
+    """
+    Получение плана запроса
+    Возвращает корневой узел "Plan" из JSON вывода EXPLAIN
+    """
+    result = await db.execute(Explain(statement, analyze=analyze))
+    raw = result.scalar()
+    data = json.loads(raw) if isinstance(raw, str) else raw
+    return data[0]["Plan"]
+
+
+async def estimate_rows(db: AsyncSession, statement) -> int:
+    """Оценка количества строк запроса планировщиком (без выполнения)"""
+    plan = await explain(db, statement)
+    return int(plan.get("Plan Rows", 0))
@@ -0,0 +1,98 @@
+"""
+Инструментирование SQL запросов
+
+Обработчики событий SQLAlchemy на engine:
+- число запросов и суммарное время БД относятся к текущему HTTP запросу
+  через contextvar (устанавливается QueryStatsMiddleware);
+- запросы дольше SQL_SLOW_QUERY_MS логируются без значений параметров;
+- один и тот же SQL, выполненный в запросе SQL_N_PLUS_ONE_THRESHOLD и более
+  раз, дает предупреждение о вероятном N+1.
+"""
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger("app.sql")
+
+STATEMENT_LOG_LIMIT = 1000  # символов SQL в сообщении
+
+
+class QueryStats:
+    """Статистика запросов к БД в пределах одного HTTP запроса"""
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # секунды
+        self.statements: Counter = Counter()
+
+    def repeated(self, threshold: int):
+        """SQL, выполненные threshold и более раз"""
+        return [(statement, count) for statement, count in self.statements.items() if count >= threshold]
+
+
+query_stats_var: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def redact_parameters(parameters) -> str:
+    """Описание параметров без значений: только количество и типы"""
+    if parameters is None:
+        return "none"
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        return f"{len(parameters)} rows x {len(parameters[0])} redacted"
+    values = parameters.values() if isinstance(parameters, dict) else parameters
+    try:
+        types = [type(value).__name__ for value in values]
+    except TypeError:
+        return "redacted"
+    return f"{len(types)} redacted ({', '.join(types[:10])}{', ...' if len(types) > 10 else ''})"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+
+    stats = query_stats_var.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+        stats.statements[statement] += 1
+
+    if elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query %.1fms: %s [params: %s]",
+            elapsed * 1000, statement[:STATEMENT_LOG_LIMIT], redact_parameters(parameters),
+        )
+
+
+def _handle_error(exception_context):
+    # Запрос завершился ошибкой - снимаем метку начала
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def install_query_instrumentation(engine: Engine):
+    """Подключение обработчиков (sync_engine для AsyncEngine)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def report_repeated_queries(stats: QueryStats, route: str):
+    """Предупреждение о вероятных N+1 по итогам HTTP запроса"""
+    for statement, count in stats.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD):
+        logger.warning(
+            "Possible N+1 in %s: statement executed %d times: %s",
+            route, count, statement[:STATEMENT_LOG_LIMIT],
+        )
@@ -3,6 +3,10 @@
 """
 from .user import User
 from .audit_log import AuditLog
+from .audit_rollup import AuditLogHourly, AuditLogDaily
+from .product_view_stat import ProductViewStat
+from .rate_limit import RateLimitCounter
+from .product import Product
 
-__all__ = ["User", "AuditLog"]
+__all__ = ["User", "AuditLog", "AuditLogHourly", "AuditLogDaily", "ProductViewStat", "RateLimitCounter", "Product"]
 
@@ -1,7 +1,7 @@
 """
 Модель журнала аудита (логирование)
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, Enum as SQLEnum
 from sqlalchemy.sql import func
 from app.db.database import Base
 import enum
@@ -62,9 +62,26 @@ class AuditLog(Base):
     Хранит все события в системе для обеспечения информационной безопасности
     """
     __tablename__ = "audit_log"
+    __table_args__ = (
+        # Составные индексы под фильтры /admin/logs с сортировкой по времени
+        Index("ix_audit_log_operation_timestamp", "operation", "timestamp"),
+        Index("ix_audit_log_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_audit_log_ip_address_timestamp", "ip_address", "timestamp"),
+        Index("ix_audit_log_role_timestamp", "role", "timestamp"),
+        # Триграммный индекс для поиска подстроки username ILIKE '%x%' (pg_trgm)
+        Index(
+            "ix_audit_log_username_trgm",
+            "username",
+            postgresql_using="gin",
+            postgresql_ops={"username": "gin_trgm_ops"},
+        ),
+        # Секционирование по месяцам (см. app.db.partitions);
+        # ключ секционирования обязан входить в первичный ключ
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    timestamp = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), index=True)
     
     # Информация о пользователе
     user_id = Column(Integer, nullable=True)  # NULL если неаутентифицированный
@@ -72,7 +89,7 @@ class AuditLog(Base):
     role = Column(String(20), nullable=True)  # Роль на момент события
     
     # Информация об операции
-    operation = Column(SQLEnum(OperationType), nullable=False, index=True)
+    operation = Column(SQLEnum(OperationType), nullable=False)
     target_table = Column(String(50), nullable=True)  # Таблица/сущность
     target_id = Column(Integer, nullable=True)  # ID записи
     
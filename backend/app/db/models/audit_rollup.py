@@ -0,0 +1,34 @@
+"""
+Агрегаты журнала аудита (почасовые и посуточные счетчики)
+"""
+from sqlalchemy import Column, String, DateTime, BigInteger, Enum as SQLEnum
+from app.db.database import Base
+from app.db.models.audit_log import OperationType, StatusType
+
+
+class AuditRollupMixin:
+    """
+    Общие колонки агрегатов
+    username = '' для событий без пользователя (NULL нельзя включить в первичный ключ)
+    """
+    bucket = Column(DateTime(timezone=True), primary_key=True)  # Начало часа/суток (UTC)
+    operation = Column(SQLEnum(OperationType), primary_key=True)
+    status = Column(SQLEnum(StatusType), primary_key=True)
+    username = Column(String(50), primary_key=True, default="")
+    count = Column(BigInteger, nullable=False, default=0)
+
+
+class AuditLogHourly(AuditRollupMixin, Base):
+    """Количество событий по часам"""
+    __tablename__ = "audit_log_hourly"
+
+    def __repr__(self):
+        return f"<AuditLogHourly {self.bucket} {self.operation} {self.status} {self.username}: {self.count}>"
+
+
+class AuditLogDaily(AuditRollupMixin, Base):
+    """Количество событий по суткам"""
+    __tablename__ = "audit_log_daily"
+
+    def __repr__(self):
+        return f"<AuditLogDaily {self.bucket} {self.operation} {self.status} {self.username}: {self.count}>"
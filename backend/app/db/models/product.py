@@ -0,0 +1,31 @@
+"""
+Модель товара каталога
+"""
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Numeric, Text
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class Product(Base):
+    """
+    Товар каталога
+    Товары не удаляются физически (is_active=False): воркеры обновляют
+    каталог в памяти по updated_at, и удаление должно быть видно как изменение
+    """
+    __tablename__ = "products"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(200), nullable=False)
+    description = Column(Text, nullable=False, default="")
+    price = Column(Numeric(10, 2), nullable=False)
+    category = Column(String(100), nullable=False, index=True)
+    image_url = Column(String(500), nullable=True)
+    in_stock = Column(Boolean, default=True, nullable=False)
+    is_active = Column(Boolean, default=True, nullable=False)
+    
+    # Временные метки (updated_at обновляется и триггером - для изменений мимо ORM)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<Product {self.id}: {self.name}>"
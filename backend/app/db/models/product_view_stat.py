@@ -0,0 +1,22 @@
+"""
+Модель агрегированной статистики просмотров каталога
+"""
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger
+from app.db.database import Base
+
+
+class ProductViewStat(Base):
+    """
+    Количество просмотров каталога по минутам
+    product_id = 0 - просмотр списка товаров, category = '' - без фильтра категории
+    """
+    __tablename__ = "product_view_stats"
+    
+    minute = Column(DateTime(timezone=True), primary_key=True)  # Начало минуты (UTC)
+    product_id = Column(Integer, primary_key=True, default=0)
+    category = Column(String(100), primary_key=True, default="")
+    ip_bucket = Column(String(50), primary_key=True, default="")  # Подсеть /24 (IPv4) или /48 (IPv6)
+    count = Column(BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ProductViewStat {self.minute} product={self.product_id} {self.ip_bucket}: {self.count}>"
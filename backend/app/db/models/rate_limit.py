@@ -0,0 +1,18 @@
+"""
+Модель счетчиков ограничения частоты запросов (общий backend для воркеров)
+"""
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime
+from app.db.database import Base
+
+
+class RateLimitCounter(Base):
+    """Число попыток по ключу в окне фиксированной длины"""
+    __tablename__ = "rate_limit_counters"
+    
+    key = Column(String(255), primary_key=True)  # scope:тип:значение
+    window_index = Column(BigInteger, primary_key=True)  # floor(unix_time / window)
+    count = Column(Integer, nullable=False, default=0)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<RateLimitCounter {self.key} [{self.window_index}]: {self.count}>"
@@ -0,0 +1,155 @@
+"""
+Помесячные секции таблицы audit_log
+
+- заблаговременное создание секций на AUDIT_PARTITIONS_AHEAD месяцев вперед
+- хранение: секции старше AUDIT_RETENTION_MONTHS отсоединяются и удаляются
+  (DETACH + DROP - операция над метаданными вместо массового DELETE)
+
+Почасовые/посуточные агрегаты (audit_log_hourly/daily) при этом сохраняются.
+"""
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.config import settings
+from app.db.database import engine
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "audit_log"
+PARTITION_NAME = re.compile(r"^audit_log_y(\d{4})m(\d{2})$")
+# Ключ advisory lock, чтобы обслуживание выполнял только один воркер
+LOCK_KEY = "audit_log_partitions"
+
+
+def add_months(month: date, months: int) -> date:
+    """Первое число месяца, смещенного на months"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_ddl(month: date) -> str:
+    """CREATE TABLE для секции месяца month (границы в UTC)"""
+    upper = add_months(month, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} "
+        f"PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+    )
+
+
+async def list_partitions(conn: AsyncConnection) -> List[str]:
+    """Имена помесячных секций audit_log"""
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:parent AS regclass) "
+        "ORDER BY c.relname"
+    ), {"parent": PARENT_TABLE})
+    return [name for name in result.scalars() if PARTITION_NAME.match(name)]
+
+
+async def ensure_partitions(conn: AsyncConnection, months_ahead: int, now: Optional[datetime] = None) -> List[str]:
+    """Создание секций с текущего месяца на months_ahead вперед"""
+    current = month_start(now or datetime.now(timezone.utc))
+    existing = set(await list_partitions(conn))
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if name not in existing:
+            await conn.execute(text(partition_ddl(month)))
+            created.append(name)
+    return created
+
+
+async def drop_expired_partitions(conn: AsyncConnection, retention_months: int, now: Optional[datetime] = None) -> List[str]:
+    """
+    Удаление секций, целиком старше retention_months месяцев
+    retention_months <= 0 - хранение без ограничения
+    """
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -retention_months)
+    dropped = []
+    for name in await list_partitions(conn):
+        match = PARTITION_NAME.match(name)
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        if add_months(month, 1) <= cutoff:
+            await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            await conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+async def maintain_partitions() -> bool:
+    """
+    Один проход обслуживания секций
+    Возвращает False, если обслуживание уже выполняет другой воркер
+    """
+    async with engine.begin() as conn:
+        locked = await conn.execute(
+            text("SELECT pg_try_advisory_xact_lock(hashtext(:key))"), {"key": LOCK_KEY}
+        )
+        if not locked.scalar():
+            return False
+
+        created = await ensure_partitions(conn, settings.AUDIT_PARTITIONS_AHEAD)
+        dropped = await drop_expired_partitions(conn, settings.AUDIT_RETENTION_MONTHS)
+
+    if created:
+        logger.info(f"Audit log partitions created: {', '.join(created)}")
+    if dropped:
+        logger.info(f"Audit log partitions dropped by retention: {', '.join(dropped)}")
+    return True
+
+
+class PartitionMaintainer:
+    """Периодическое обслуживание секций (запускается из lifespan)"""
+
+    def __init__(self, interval: float = settings.AUDIT_PARTITION_MAINTENANCE_INTERVAL):
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is not None:
+            return
+        # Первый проход синхронно: секция текущего месяца нужна до первой записи
+        try:
+            await maintain_partitions()
+        except Exception as e:
+            logger.error(f"Audit log partition maintenance failed: {e}")
+        self._task = asyncio.create_task(self._run(), name="audit-partitions")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await maintain_partitions()
+            except Exception as e:
+                logger.error(f"Audit log partition maintenance failed: {e}")
+
+
+partition_maintainer = PartitionMaintainer()
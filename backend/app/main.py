@@ -6,36 +6,30 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from starlette.middleware.sessions import SessionMiddleware
 from contextlib import asynccontextmanager
+from sqlalchemy import text
+import asyncio
 import logging
-from logging.handlers import RotatingFileHandler
-import os
 
 from app.core.config import settings
+from app.core.log_pipeline import setup_logging, shutdown_logging
+from app.middleware.request_id import RequestIdMiddleware
+from app.middleware.timing import TimingMiddleware
+from app.middleware.query_stats import QueryStatsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
 from app.db.database import engine
-from app.api import auth, twofa, admin, logs, products, google_oauth
+from app.core.audit_writer import audit_writer
+from app.db.partitions import partition_maintainer
+from app.core.view_counter import view_counter
+from app.core.invalidation import invalidation_bus
+from app.core.catalog import catalog
+from app.core.email_outbox import email_outbox
+from app.core.loop_monitor import loop_monitor
+from app.core.security import HashingOverloaded, password_hasher
+from app.api import auth, twofa, admin, logs, products, google_oauth, metrics, profiles
 
 
-# Настройка логирования в файл
-os.makedirs("logs", exist_ok=True)
-
-file_handler = RotatingFileHandler(
-    "logs/app.log",
-    maxBytes=10485760,  # 10MB
-    backupCount=10
-)
-file_handler.setLevel(logging.INFO)
-file_formatter = logging.Formatter(
-    '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-file_handler.setFormatter(file_formatter)
-
-logging.basicConfig(
-    level=logging.INFO,
-    handlers=[
-        file_handler,
-        logging.StreamHandler()  # Также вывод в консоль
-    ]
-)
+# Логирование: JSON строки через очередь (запись в файл в отдельном потоке)
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -44,14 +38,31 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Lifecycle events"""
     logger.info("Starting up application...")
-    logger.info(f"Database URL: {settings.DATABASE_URL.split('@')[1] if '@' in settings.DATABASE_URL else 'N/A'}")
+    logger.info("Database URL: %s", settings.DATABASE_URL.split('@')[1] if '@' in settings.DATABASE_URL else 'N/A')
     
     # Startup
+    await loop_monitor.start()
+    await partition_maintainer.start()
+    await audit_writer.start()
+    await view_counter.start()
+    await invalidation_bus.start()
+    await catalog.start()
+    await email_outbox.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down application...")
+    await email_outbox.stop()
+    await catalog.stop()
+    await invalidation_bus.stop()
+    await view_counter.stop()
+    await audit_writer.stop()
+    await partition_maintainer.stop()
+    password_hasher.shutdown()
     await engine.dispose()
+    await loop_monitor.stop()
+    shutdown_logging()
 
 
 # Создание приложения
@@ -80,30 +91,40 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(HashingOverloaded)
+async def hashing_overloaded_handler(request: Request, exc: HashingOverloaded):
+    """Очередь хэширования паролей переполнена - просим повторить позже"""
+    logger.warning("Password hashing saturated: %s %s", request.method, request.url.path)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Сервер перегружен, повторите попытку позже"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
 # Глобальный обработчик ошибок
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Обработка всех необработанных исключений"""
-    logger.error(f"Unhandled exception: {exc}", exc_info=True)
+    logger.error("Unhandled exception: %s", exc, exc_info=True)
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": "Внутренняя ошибка сервера"}
     )
 
 
-# Middleware для логирования запросов
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Логирование всех HTTP запросов"""
-    logger.info(f"{request.method} {request.url.path} from {request.client.host if request.client else 'unknown'}")
-    
-    try:
-        response = await call_next(request)
-        logger.info(f"Response status: {response.status_code}")
-        return response
-    except Exception as e:
-        logger.error(f"Request failed: {e}", exc_info=True)
-        raise
+# Профилирование по флагу X-Profile (без флага - только проверка заголовков)
+app.add_middleware(ProfilingMiddleware)
+
+# Статистика SQL по запросу (Server-Timing, N+1)
+app.add_middleware(QueryStatsMiddleware)
+
+# Учет запросов: access log и гистограммы латентности по маршрутам
+app.add_middleware(TimingMiddleware)
+
+# Request id - добавляется последним, т.е. внешний слой: id доступен
+# всем middleware и обработчикам
+app.add_middleware(RequestIdMiddleware)
 
 
 # Подключение роутеров
@@ -113,6 +134,8 @@ app.include_router(admin.router)
 app.include_router(logs.router)
 app.include_router(products.router)
 app.include_router(google_oauth.router)
+app.include_router(profiles.router)
+app.include_router(metrics.router)
 
 
 # Health check
@@ -128,12 +151,32 @@ async def root():
 
 @app.get("/health", tags=["Health"])
 async def health_check():
-    """Detailed health check"""
-    return {
-        "status": "healthy",
-        "database": "connected",
-        "version": settings.VERSION
-    }
+    """Detailed health check (реальная проверка БД и фоновых задач)"""
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    try:
+        # Таймаут покрывает и ожидание соединения из пула / подключение
+        await asyncio.wait_for(ping(), settings.HEALTH_DB_TIMEOUT)
+        database = "connected"
+    except Exception as e:
+        logger.warning("Health check: database unavailable: %r", e)
+        database = "unavailable"
+    
+    healthy = database == "connected"
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "healthy" if healthy else "unhealthy",
+            "database": database,
+            "audit_writer": "running" if audit_writer.running else "stopped",
+            "email_outbox": "running" if email_outbox.running else "stopped",
+            "catalog": "loaded" if catalog.loaded else "not loaded",
+            "invalidation_bus": "connected" if invalidation_bus.stats()["connected"] else "disconnected",
+            "version": settings.VERSION
+        }
+    )
 
 
 if __name__ == "__main__":
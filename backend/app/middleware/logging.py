@@ -5,6 +5,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import insert
 from app.db.models.audit_log import AuditLog, OperationType, StatusType
 from app.db.models.user import User
+from app.core.audit_writer import audit_writer
+from app.db.audit_rollups import apply_rollups
+from app.core.config import settings
 from typing import Optional
 from datetime import datetime, timezone
 
@@ -23,6 +26,10 @@ async def log_audit_event(
     """
     Создание записи в журнале аудита
     
+    Если фоновый писатель запущен, событие ставится в его очередь и
+    записывается пакетом отдельной сессией; сессия запроса не коммитится.
+    Иначе (скрипты, тесты) запись выполняется сразу в переданной сессии.
+    
     Args:
         db: Сессия базы данных
         operation: Тип операции
@@ -48,8 +55,13 @@ async def log_audit_event(
             "details": details
         }
         
+        if audit_writer.running:
+            await audit_writer.enqueue(log_entry)
+            return
+        
         stmt = insert(AuditLog).values(**log_entry)
         await db.execute(stmt)
+        await apply_rollups(db, [log_entry])
         await db.commit()
     except Exception as e:
         # Логируем ошибку, но не прерываем основной процесс
@@ -76,3 +88,22 @@ def get_client_ip(request) -> str:
     
     return "unknown"
 
+
+def get_trusted_client_ip(request) -> str:
+    """
+    IP клиента для ограничений (rate limit), без доверия заголовкам клиента
+    
+    X-Forwarded-For учитывается, только если перед приложением стоят
+    TRUSTED_PROXY_COUNT прокси: каждый дописывает адрес своего клиента справа,
+    поэтому клиент - первый справа адрес, добавленный не нашими прокси.
+    Левые значения клиент может подставить сам.
+    """
+    direct = request.client.host if request.client else "unknown"
+    proxies = settings.TRUSTED_PROXY_COUNT
+    if proxies <= 0:
+        return direct
+    
+    forwarded = request.headers.get("X-Forwarded-For", "")
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()] + [direct]
+    return hops[max(len(hops) - 1 - proxies, 0)]
+
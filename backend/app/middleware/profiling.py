@@ -0,0 +1,133 @@
+"""
+Профилирование отдельных запросов по запросу персонала
+
+Запрос профилируется cProfile, если:
+- PROFILING_ENABLED;
+- есть заголовок X-Profile: 1 или параметр ?profile=1;
+- access токен принадлежит admin или staff (principal проверяется так же,
+  как в зависимостях авторизации: сессия токена, блокировка, текущая роль).
+Профиль сохраняется в profile_store, id возвращается в заголовке X-Profile-Id.
+Для запросов без флага middleware только проверяет наличие флага.
+
+cProfile профилирует поток целиком, поэтому в профиль попадает и работа
+конкурентных запросов воркера; одновременно профилируется один запрос.
+"""
+import asyncio
+import cProfile
+import logging
+import time
+from urllib.parse import parse_qsl
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from app.core.config import settings
+from app.core.profiling import profile_store
+from app.auth.dependencies import get_token_user_id, load_principal
+from app.db.database import AsyncSessionLocal
+from app.db.models.user import UserRole
+from app.middleware.timing import route_template
+
+logger = logging.getLogger(__name__)
+
+FLAG_HEADER = b"x-profile"
+ID_HEADER = b"x-profile-id"
+STATUS_HEADER = b"x-profile-status"
+PROFILER_ROLES = {UserRole.ADMIN.value, UserRole.STAFF.value}
+
+
+def profiling_requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == FLAG_HEADER:
+            return value in (b"1", b"true")
+    query = scope.get("query_string", b"").decode("latin-1")
+    return any(name == "profile" and value in ("1", "true") for name, value in parse_qsl(query))
+
+
+async def is_staff_request(scope) -> bool:
+    """
+    Роль principal, а не токена: как в get_current_principal (кэш, иначе
+    БД; сессия токена и блокировка проверяются). При попадании в кэш
+    соединение из пула не берется
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return False
+            credentials = HTTPAuthorizationCredentials(scheme=scheme, credentials=token)
+            try:
+                user_id, payload = get_token_user_id(credentials)
+                async with AsyncSessionLocal() as db:
+                    principal = await load_principal(db, user_id, payload)
+            except HTTPException:
+                return False
+            except Exception as e:
+                logger.warning("Profiling: cannot resolve principal: %s", e)
+                return False
+            return principal.role.value in PROFILER_ROLES
+    return False
+
+
+class ProfilingMiddleware:
+    """Чистый ASGI middleware"""
+
+    def __init__(self, app, store=profile_store):
+        self.app = app
+        self.store = store
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED or not profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not await is_staff_request(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if self._active:
+            await self.app(scope, receive, self._with_headers(send, [(STATUS_HEADER, b"busy")]))
+            return
+
+        await self._profile(scope, receive, send)
+
+    def _with_headers(self, send, headers):
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+        return send_with_headers
+
+    async def _profile(self, scope, receive, send):
+        self._active = True
+        status_code = 500
+        # id резервируется заранее: заголовок ответа уходит до сохранения профиля
+        profile_id = self.store.new_id()
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(ID_HEADER, profile_id.encode())]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            self._active = False
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route_template(scope),
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            }
+            try:
+                await asyncio.to_thread(self.store.save, profiler, meta, profile_id)
+                logger.info("Request profile %s saved for %s %s", profile_id, meta["method"], meta["path"])
+            except Exception as e:
+                logger.error("Failed to save request profile: %s", e)
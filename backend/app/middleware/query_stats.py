@@ -0,0 +1,43 @@
+"""
+Middleware статистики SQL запросов
+
+Создает QueryStats для каждого HTTP запроса и добавляет в ответ заголовок
+Server-Timing (db - время БД и число запросов, app - время до начала
+ответа). Запросы, выполненные после начала ответа (потоковые ответы,
+commit в get_db), в заголовок не попадают, но учитываются при проверке N+1.
+"""
+import time
+
+from app.db.instrumentation import QueryStats, query_stats_var, report_repeated_queries
+from app.middleware.timing import route_template
+
+HEADER = b"server-timing"
+
+
+class QueryStatsMiddleware:
+    """Чистый ASGI middleware"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = query_stats_var.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                app_ms = (time.perf_counter() - started) * 1000
+                value = f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", app;dur={app_ms:.1f}'
+                message["headers"] = list(message.get("headers", [])) + [(HEADER, value.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            query_stats_var.reset(token)
+            report_repeated_queries(stats, f"{scope['method']} {route_template(scope)}")
@@ -0,0 +1,46 @@
+"""
+Middleware идентификатора запроса
+
+Берет X-Request-ID из запроса (если он разумной длины) или генерирует
+новый, кладет его в contextvar для логирования и возвращает в ответе.
+"""
+import uuid
+
+from app.core.log_pipeline import request_id_var
+
+HEADER = b"x-request-id"
+MAX_LENGTH = 128
+
+
+class RequestIdMiddleware:
+    """Чистый ASGI middleware (без буферизации тела ответа)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == HEADER and 0 < len(value) <= MAX_LENGTH:
+                request_id = value.decode("latin-1")
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+
+        scope.setdefault("state", {})["request_id"] = request_id
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
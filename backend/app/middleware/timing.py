@@ -0,0 +1,68 @@
+"""
+Middleware учета запросов (access log + метрики латентности)
+
+Чистый ASGI: тело ответа не буферизуется и не оборачивается в отдельную
+задачу (в отличие от BaseHTTPMiddleware), поэтому потоковые ответы
+работают как есть. Из сообщений ответа берутся только статус и размер.
+"""
+import logging
+import time
+
+from app.core.loop_monitor import loop_monitor
+from app.core.metrics import request_metrics
+
+logger = logging.getLogger("app.access")
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope) -> str:
+    """Шаблон пути маршрута (/admin/users/{user_id}), а не фактический путь"""
+    route = scope.get("route")
+    path = getattr(route, "path_format", None) or getattr(route, "path", None)
+    return path or UNMATCHED_ROUTE
+
+
+class TimingMiddleware:
+    """Метод, маршрут, статус, байты, wall и CPU время каждого запроса"""
+
+    def __init__(self, app, metrics=request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        bytes_sent = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, bytes_sent
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                bytes_sent += len(message.get("body", b""))
+            await send(message)
+
+        loop_monitor.request_started(f"{scope['method']} {scope['path']}")
+        started = time.perf_counter()
+        # CPU время потока за время запроса: в event loop включает и работу
+        # конкурентных запросов, поэтому это верхняя оценка
+        cpu_started = time.thread_time()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            loop_monitor.request_finished()
+            wall = time.perf_counter() - started
+            cpu = time.thread_time() - cpu_started
+            method = scope["method"]
+            route = route_template(scope)
+            self.metrics.observe(method, route, status_code, wall, cpu, bytes_sent)
+            client = scope.get("client")
+            logger.info(
+                "%s %s %s %d %dB %.1fms cpu=%.1fms from %s",
+                method, scope["path"], route, status_code, bytes_sent,
+                wall * 1000, cpu * 1000, client[0] if client else "unknown",
+            )
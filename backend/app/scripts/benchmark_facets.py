@@ -0,0 +1,157 @@
+"""
+Бенчмарк фасетной фильтрации каталога на синтетическом каталоге
+
+Запуск: python -m app.scripts.benchmark_facets [товаров] [итераций]
+
+Для каждого набора фильтров FacetIndex.query сравнивается с наивной
+реализацией (перебор списка товаров, сортировка и подсчет фасетов на
+каждый запрос): результаты должны совпасть, время сравнивается.
+"""
+import statistics
+import sys
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Добавляем путь к корню проекта
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import logging
+from app.core.catalog import CatalogItem, normalize_category
+from app.core.facets import FacetIndex
+from app.scripts.benchmark_search import synthetic_catalog
+
+DEFAULT_PRODUCTS = 100_000
+DEFAULT_ITERATIONS = 50
+PRICE_BUCKETS = [2000.0, 5000.0, 10000.0, 20000.0]
+PAGE_SIZE = 24
+
+CASES = [
+    ("без фильтров, по id", {}),
+    ("категория, по цене", {"categories": ["Солнцезащитные"], "sort": "price"}),
+    ("2 категории + цена + наличие", {"categories": ["Детские", "Спортивные"], "min_price": 3000, "max_price": 15000, "in_stock": True}),
+    ("узкий диапазон цены, по имени", {"min_price": 10000, "max_price": 10500, "sort": "name"}),
+    ("нет в наличии, по убыванию цены", {"in_stock": False, "sort": "-price"}),
+    ("категория, по имени, стр. 50", {"categories": ["Оправы"], "sort": "-name", "offset": 49 * PAGE_SIZE}),
+    ("пустой результат", {"categories": ["Нет такой"], "min_price": 1}),
+]
+
+SORT_KEYS = {
+    "id": (lambda item: item.id, False),
+    "price": (lambda item: (item.price, item.id), False),
+    "-price": (lambda item: (item.price, item.id), True),
+    "name": (lambda item: (item.name.casefold(), item.id), False),
+    "-name": (lambda item: (item.name.casefold(), item.id), True),
+}
+
+
+def naive_query(
+    items: List[CatalogItem],
+    categories=(),
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: Optional[bool] = None,
+    sort: str = "id",
+    offset: int = 0,
+    limit: int = PAGE_SIZE,
+) -> Dict[str, Any]:
+    """Фильтрация перебором (как до индекса)"""
+    keys = {normalize_category(category) for category in categories}
+
+    def matches(item, skip: str = "") -> bool:
+        return (
+            (skip == "category" or not keys or normalize_category(item.category) in keys)
+            and (skip == "price" or ((min_price is None or item.price >= min_price) and (max_price is None or item.price <= max_price)))
+            and (skip == "stock" or in_stock is None or item.in_stock == in_stock)
+        )
+
+    found = [item for item in items if matches(item)]
+    key, reverse = SORT_KEYS[sort]
+    found.sort(key=key, reverse=reverse)
+
+    category_counts: Dict[str, int] = {}
+    stock_counts = {"true": 0, "false": 0}
+    price_counts = [0] * (len(PRICE_BUCKETS) + 1)
+    for item in items:
+        category_counts.setdefault(normalize_category(item.category), 0)
+        if matches(item, "category"):
+            category_counts[normalize_category(item.category)] += 1
+        if matches(item, "stock"):
+            stock_counts["true" if item.in_stock else "false"] += 1
+        if matches(item, "price"):
+            price_counts[bisect_right(PRICE_BUCKETS, item.price)] += 1
+
+    return {
+        "ids": [item.id for item in found[offset:offset + limit]],
+        "total": len(found),
+        "categories": [count for _, count in sorted(category_counts.items())],
+        "in_stock": stock_counts,
+        "price": price_counts,
+    }
+
+
+def measure(func, iterations: int) -> list:
+    """Время одного вызова, мс"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    """Главная функция"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PRODUCTS
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ITERATIONS
+    logging.disable(logging.INFO)
+
+    print("=" * 60)
+    print(f"Фасетная фильтрация: {count} товаров, {iterations} итераций")
+    print("=" * 60)
+
+    items = synthetic_catalog(count)
+    index = FacetIndex(price_buckets=PRICE_BUCKETS)
+    index.update(items, [])
+    started = time.perf_counter()
+    index.query()
+    print(f"Построение снимка индекса: {(time.perf_counter() - started) * 1000:.0f} мс")
+
+    # Инкрементальное обновление: изменение цены одного товара (ключи через bisect)
+    changed = items[count // 2]
+    items[count // 2] = CatalogItem(
+        changed.id, changed.name, changed.description, changed.price * 2,
+        changed.category, None, changed.in_stock, changed.updated_at,
+    )
+    started = time.perf_counter()
+    index.update([items[count // 2]], [])
+    print(f"Инкрементальное обновление 1 товара: {(time.perf_counter() - started) * 1000:.2f} мс")
+    print("-" * 60)
+
+    ok = True
+    for title, params in CASES:
+        result = index.query(limit=PAGE_SIZE, **params)
+        expected = naive_query(items, **params)
+        actual = {
+            "ids": [item.id for item in result.items],
+            "total": result.total,
+            "categories": [value["count"] for value in result.facets["category"]],
+            "in_stock": result.facets["in_stock"],
+            "price": [bucket["count"] for bucket in result.facets["price"]],
+        }
+        correct = actual == expected
+        ok = ok and correct
+
+        indexed = statistics.median(measure(lambda: index.query(limit=PAGE_SIZE, **params), iterations))
+        naive = statistics.median(measure(lambda: naive_query(items, **params), max(iterations // 10, 1)))
+        print(f"{'✅' if correct else '❌'} {title:<34} {indexed:7.3f} мс  (перебор {naive:7.1f} мс, x{naive / indexed:.0f})  найдено {result.total}")
+
+    print("=" * 60)
+    print("✅ Результаты совпадают с перебором" if ok else "❌ Результаты расходятся с перебором")
+    print("=" * 60)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
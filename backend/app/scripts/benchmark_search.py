@@ -0,0 +1,139 @@
+"""
+Бенчмарк поиска по каталогу на синтетическом каталоге
+
+Запуск: python -m app.scripts.benchmark_search [товаров] [итераций]
+
+Каталог генерируется детерминированно (по умолчанию 100 000 товаров),
+индекс строится так же, как в воркере: через слушатель изменений каталога.
+Для каждого запроса измеряется SearchIndex.search (top-20) без кэша
+результатов; повторный запрос из кэша отдельно в конце.
+"""
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+# Добавляем путь к корню проекта
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.core.catalog import CatalogItem, CatalogReadModel
+from app.core.search import SearchIndex
+
+DEFAULT_PRODUCTS = 100_000
+DEFAULT_ITERATIONS = 200
+TARGET_MS = 1.0
+
+CATEGORIES = ["Солнцезащитные", "Для чтения", "Спортивные", "Компьютерные", "Детские", "Оправы", "Контактные линзы", "Аксессуары"]
+KINDS = ["Очки", "Оправа", "Линзы", "Футляр", "Маска", "Клипон"]
+BRANDS = ["Ray-Ban", "Oakley", "Polaroid", "Carrera", "Prada", "Gucci", "Vogue", "Persol", "Silhouette", "Disney"]
+ADJECTIVES = [
+    "классические", "легкие", "титановые", "пластиковые", "металлические", "поляризационные",
+    "фотохромные", "антибликовые", "ударопрочные", "детские", "женские", "мужские", "складные",
+]
+WORDS = [
+    "защита", "синего", "света", "ультрафиолета", "оправа", "линзы", "покрытие", "спорта", "отдыха",
+    "вождения", "компьютера", "чтения", "дужки", "переносица", "гипоаллергенный", "материал",
+    "устойчивые", "царапинам", "стильный", "дизайн", "комфортная", "посадка", "гарантия", "года",
+]
+
+QUERIES = [
+    "очки",
+    "ray-ban",
+    "поляризационные",
+    "титановая оправа",
+    "очки для вождения",
+    "детские спортивные",
+    "фотохром",
+    "prad",
+    "защита синего света",
+    "zzz несуществующий",
+]
+
+
+def synthetic_catalog(count: int, seed: int = 42) -> List[CatalogItem]:
+    """Детерминированный синтетический каталог"""
+    rng = random.Random(seed)
+    started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    items = []
+    for product_id in range(1, count + 1):
+        category = rng.choice(CATEGORIES)
+        name = f"{rng.choice(KINDS)} {rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} {rng.randint(100, 9999)}"
+        description = " ".join(rng.sample(WORDS, 8))
+        items.append(CatalogItem(
+            id=product_id,
+            name=name,
+            description=description,
+            price=round(rng.uniform(500, 60000), 2),
+            category=category,
+            image_url=None,
+            in_stock=rng.random() > 0.2,
+            updated_at=started + timedelta(milliseconds=product_id),
+        ))
+    return items
+
+
+def measure(func, iterations: int) -> list:
+    """Время одного вызова, мс"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    """Главная функция"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PRODUCTS
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ITERATIONS
+
+    print("=" * 60)
+    print(f"Поиск по каталогу: {count} товаров, {iterations} итераций на запрос")
+    print("=" * 60)
+
+    items = synthetic_catalog(count)
+    read_model = CatalogReadModel()
+    index = SearchIndex()
+    read_model.on_change(index.update)
+
+    started = time.perf_counter()
+    read_model.apply(items)
+    print(f"Загрузка каталога и построение индекса: {time.perf_counter() - started:.2f} с")
+    print(f"Индекс: {index.stats()}")
+
+    # Инкрементальное обновление: изменение одного товара
+    changed = items[count // 2]
+    updated = CatalogItem(
+        changed.id, changed.name + " обновленные", changed.description, changed.price,
+        changed.category, None, changed.in_stock, changed.updated_at + timedelta(days=1),
+    )
+    started = time.perf_counter()
+    read_model.apply([updated])
+    print(f"Инкрементальное обновление 1 товара: {(time.perf_counter() - started) * 1000:.2f} мс")
+    print("-" * 60)
+
+    ok = True
+    for query in QUERIES:
+        index.search(query)  # прогрев (упорядоченные постинги строятся лениво)
+        timings = sorted(measure(lambda: index.search(query, use_cache=False), iterations))
+        median = statistics.median(timings)
+        p99 = timings[max(int(len(timings) * 0.99) - 1, 0)]
+        hits = len(index.search(query))
+        passed = median < TARGET_MS
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} {query!r:<28} median {median:7.3f} мс   p99 {p99:7.3f} мс   top {hits}")
+
+    cached = sorted(measure(lambda: index.search(QUERIES[5]), iterations))
+    print(f"Повторный запрос из кэша результатов: median {statistics.median(cached):.4f} мс")
+
+    print("=" * 60)
+    print("✅ Все запросы быстрее 1 мс (медиана)" if ok else "❌ Есть запросы медленнее 1 мс (медиана)")
+    print("=" * 60)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Микробенчмарк проверки JWT на запрос: без кэша и с кэшем проверенных токенов
+
+Запуск: python -m app.scripts.benchmark_token_cache [итераций]
+
+Измеряется verify_token и get_token_user_id (вся проверка токена в
+зависимостях аутентификации) для одного и того же access токена,
+как это происходит при повторных запросах одного клиента.
+"""
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Добавляем путь к корню проекта
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import logging
+from fastapi.security import HTTPAuthorizationCredentials
+from app.core import security
+from app.core.security import create_access_token, decode_token, generate_session_token, token_cache
+from app.auth.dependencies import get_token_user_id
+
+DEFAULT_ITERATIONS = 20000
+
+
+def measure(func, iterations: int) -> list:
+    """Время одного вызова, мкс"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return timings
+
+
+def report(title: str, timings: list):
+    timings = sorted(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"{title:<34} median {statistics.median(timings):8.2f} мкс   p99 {p99:8.2f} мкс")
+
+
+def main():
+    """Главная функция"""
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITERATIONS
+    # Логирование в get_token_user_id не должно влиять на замер
+    logging.disable(logging.INFO)
+
+    token = create_access_token({"sub": "1", "username": "bench", "role": "user", "session": generate_session_token()})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    print("=" * 60)
+    print(f"Проверка JWT: {iterations} итераций")
+    print("=" * 60)
+
+    uncached = measure(lambda: decode_token(token, use_cache=False), iterations)
+    token_cache.clear()
+    decode_token(token)
+    cached = measure(lambda: decode_token(token), iterations)
+    report("decode_token без кэша", uncached)
+    report("decode_token с кэшем", cached)
+
+    original_decode = security.decode_token
+    security.decode_token = lambda value: original_decode(value, use_cache=False)
+    try:
+        request_uncached = measure(lambda: get_token_user_id(credentials), iterations)
+    finally:
+        security.decode_token = original_decode
+    request_cached = measure(lambda: get_token_user_id(credentials), iterations)
+    report("get_token_user_id без кэша", request_uncached)
+    report("get_token_user_id с кэшем", request_cached)
+
+    speedup = statistics.median(request_uncached) / statistics.median(request_cached)
+    print("=" * 60)
+    print(f"✅ Ускорение проверки токена на запрос: x{speedup:.1f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Проверка: анонимные запросы каталога не занимают соединения пула БД
+
+Запуск: python -m app.scripts.check_catalog_pool [товаров]
+
+Каталог загружается синтетический (БД не нужна), счетчик просмотров
+запущен, как в воркере. Число обращений к пулу считается по гистограмме
+ожидания соединения (InstrumentedPool учитывает каждую попытку, даже
+неудачную). Для маршрутов каталога (промах и попадание в кэш ответов,
+304, товар, фильтр, поиск) обращений быть не должно; контрольный запрос
+в режиме PRODUCT_VIEW_MODE=audit обязан обратиться к пулу - значит, счет
+работает.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Добавляем путь к корню проекта
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import logging
+import httpx
+from app.main import app
+from app.core.catalog import catalog
+from app.core.config import settings
+from app.core.metrics import pool_wait
+from app.core.view_counter import view_counter
+from app.scripts.benchmark_search import synthetic_catalog
+
+DEFAULT_PRODUCTS = 1000
+
+REQUESTS = [
+    ("список, промах кэша", "/products", {}),
+    ("список, из кэша", "/products", {}),
+    ("список, страница по цене", "/products", {"page": 2, "sort": "price"}),
+    ("товар", "/products/7", {}),
+    ("фильтр", "/products/filter", {"category": ["Детские", "Оправы"], "max_price": 20000, "in_stock": "true"}),
+    ("фильтр, из кэша", "/products/filter", {"category": ["Детские", "Оправы"], "max_price": 20000, "in_stock": "true"}),
+    ("поиск", "/products/search", {"q": "очки детские"}),
+]
+
+
+async def main():
+    """Главная функция"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PRODUCTS
+    logging.disable(logging.ERROR)
+
+    print("=" * 60)
+    print(f"Соединения пула на запросах каталога ({count} товаров)")
+    print("=" * 60)
+
+    catalog.apply(synthetic_catalog(count))
+    await view_counter.start()
+    transport = httpx.ASGITransport(app=app)
+    ok = True
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://catalog") as client:
+            etag = None
+            for title, path, params in REQUESTS:
+                before = pool_wait.count
+                response = await client.get(path, params=params)
+                checkouts = pool_wait.count - before
+                passed = response.status_code == 200 and checkouts == 0
+                ok = ok and passed
+                etag = response.headers.get("etag") or etag
+                print(f"{'✅' if passed else '❌'} {title:<28} HTTP {response.status_code}   обращений к пулу: {checkouts}")
+
+            before = pool_wait.count
+            response = await client.get("/products", headers={"If-None-Match": etag})
+            checkouts = pool_wait.count - before
+            passed = response.status_code == 304 and checkouts == 0
+            ok = ok and passed
+            print(f"{'✅' if passed else '❌'} {'список, 304':<28} HTTP {response.status_code}   обращений к пулу: {checkouts}")
+
+            # Контроль: запись audit_log идет через ту же ленивую сессию
+            print("-" * 60)
+            settings.PRODUCT_VIEW_MODE = "audit"
+            before = pool_wait.count
+            response = await client.get("/products/7")
+            checkouts = pool_wait.count - before
+            settings.PRODUCT_VIEW_MODE = "counters"
+            passed = checkouts > 0
+            ok = ok and passed
+            print(f"{'✅' if passed else '❌'} {'контроль: режим audit':<28} HTTP {response.status_code}   обращений к пулу: {checkouts}")
+    finally:
+        await view_counter.stop()
+
+    print("=" * 60)
+    print("✅ Каталог обслуживается без соединений БД" if ok else "❌ Запросы каталога обращаются к пулу БД")
+    print("=" * 60)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+Проверка версии каталога при позднем обновлении (из окна перекрытия)
+
+Запуск: python -m app.scripts.check_catalog_version
+
+Обновление, прочитанное из окна перекрытия, имеет updated_at не позже
+водяного знака и не меняет число товаров. Проверяется, что после него:
+- меняется версия каталога;
+- меняются ETag и тело GET /products (If-None-Match со старым ETag - 200);
+- фасетный индекс (GET /products/filter) отдает новую цену и счетчики.
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Добавляем путь к корню проекта
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import logging
+import httpx
+from app.main import app
+from app.core.catalog import CatalogItem, catalog
+from app.core.facets import facet_index
+from app.core.view_counter import view_counter
+
+STARTED = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def item(product_id: int, price: float, updated_at: datetime) -> CatalogItem:
+    return CatalogItem(
+        id=product_id,
+        name=f"Очки {product_id}",
+        description="",
+        price=price,
+        category="Оправы",
+        image_url=None,
+        in_stock=True,
+        updated_at=updated_at,
+    )
+
+
+async def wait_for_facets():
+    """Списки строятся из снимка фасетного индекса, а он - в потоке"""
+    while facet_index.rebuilding:
+        await asyncio.sleep(0.01)
+
+
+def check(title: str, passed: bool) -> bool:
+    print(f"{'✅' if passed else '❌'} {title}")
+    return passed
+
+
+async def main():
+    """Главная функция"""
+    logging.disable(logging.ERROR)
+
+    print("=" * 60)
+    print("Версия каталога при позднем обновлении")
+    print("=" * 60)
+
+    await view_counter.start()
+    transport = httpx.ASGITransport(app=app)
+    ok = True
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://catalog") as client:
+            # Товар 2 обновлен позже товара 1: водяной знак - его updated_at
+            catalog.apply([item(1, 1000.0, STARTED), item(2, 2000.0, STARTED + timedelta(seconds=2))])
+            await wait_for_facets()
+            version = catalog.version
+            listing = await client.get("/products")
+            filtered = await client.get("/products/filter", params={"max_price": 1500})
+
+            # Позднее обновление товара 1: updated_at раньше водяного знака
+            changed = catalog.apply([item(1, 5000.0, STARTED + timedelta(seconds=1))])
+            await wait_for_facets()
+            ok &= check("Изменение применено", changed and catalog.get(1).price == 5000.0)
+            ok &= check(f"Версия изменилась: {version} -> {catalog.version}", catalog.version != version)
+
+            revalidated = await client.get("/products", headers={"If-None-Match": listing.headers["etag"]})
+            ok &= check(
+                f"GET /products со старым ETag: HTTP {revalidated.status_code}, ETag {revalidated.headers.get('etag')}",
+                revalidated.status_code == 200 and revalidated.headers.get("etag") != listing.headers["etag"],
+            )
+            prices = {product["id"]: product["price"] for product in revalidated.json()} if revalidated.status_code == 200 else {}
+            ok &= check("Тело списка с новой ценой", prices.get(1) == 5000.0)
+
+            refiltered = await client.get("/products/filter", params={"max_price": 1500})
+            before, after = filtered.json(), refiltered.json()
+            ok &= check(
+                f"Фильтр до цены 1500: найдено {before['total']} -> {after['total']}",
+                before["total"] == 1 and after["total"] == 0 and refiltered.headers["etag"] != filtered.headers["etag"],
+            )
+            # Фасет цены не учитывает свой фильтр: товары 1 (5000) и 2 (2000)
+            buckets = [bucket["count"] for bucket in after["facets"]["price"]]
+            ok &= check(f"Счетчики цены пересчитаны: {buckets}", buckets == [0, 1, 1, 0, 0])
+
+            # Повтор того же чтения из окна перекрытия версию не меняет
+            version = catalog.version
+            catalog.apply([item(1, 5000.0, STARTED + timedelta(seconds=1))])
+            ok &= check("Повторное чтение той же строки версию не меняет", catalog.version == version)
+    finally:
+        await view_counter.stop()
+
+    print("=" * 60)
+    print("✅ Версия и ETag следуют за изменениями" if ok else "❌ Версия или ETag не изменились")
+    print("=" * 60)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""
+Проверка очереди писем на локальном SMTP сервере-заглушке
+
+Запуск: python -m app.scripts.check_email_outbox [количество_писем]
+
+Поднимает минимальный SMTP сервер на 127.0.0.1, направляет в него
+EmailOutbox и проверяет, что:
+- все письма доставлены через одно переиспользуемое соединение;
+- письмо, временно отклоненное сервером (451), доставлено повторной попыткой;
+- постановка в очередь не ждет SMTP.
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Добавляем путь к корню проекта
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.core.email import build_verification_message
+from app.core.email_outbox import EmailOutbox, OutgoingEmail, SMTPConnection
+
+DEFAULT_EMAILS = 50
+FLAKY_RECIPIENT = "flaky@example.com"
+
+
+class StandInSMTPServer:
+    """Минимальный SMTP сервер: принимает письма и складывает их в список"""
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        self._flaky_rejected = False
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+
+        async def reply(line: str):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 stand-in ESMTP")
+        recipients = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+
+            if verb in ("EHLO", "HELO"):
+                await reply("250 stand-in")
+            elif verb == "MAIL":
+                recipients = []
+                await reply("250 OK")
+            elif verb == "RCPT":
+                if FLAKY_RECIPIENT in command and not self._flaky_rejected:
+                    self._flaky_rejected = True
+                    await reply("451 Try again later")
+                else:
+                    recipients.append(command)
+                    await reply("250 OK")
+            elif verb == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                body = []
+                while True:
+                    data_line = await reader.readline()
+                    if data_line in (b".\r\n", b".\n", b""):
+                        break
+                    body.append(data_line)
+                self.messages.append((recipients, b"".join(body)))
+                await reply("250 OK")
+            elif verb in ("NOOP", "RSET"):
+                await reply("250 OK")
+            elif verb == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("502 Command not implemented")
+
+        writer.close()
+
+
+async def check_outbox(count: int) -> bool:
+    server = StandInSMTPServer()
+    port = await server.start()
+
+    connection = SMTPConnection(host="127.0.0.1", port=port, username="", password="", starttls=False, timeout=5)
+    outbox = EmailOutbox(connection=connection, batch_size=20, retry_base_delay=0.2)
+    await outbox.start()
+
+    recipients = [f"user{i}@example.com" for i in range(count)] + [FLAKY_RECIPIENT]
+    started = time.perf_counter()
+    for i, recipient in enumerate(recipients):
+        outbox.enqueue(OutgoingEmail(
+            sender="noreply@example.com",
+            recipient=recipient,
+            message=build_verification_message(recipient, f"{i:06d}", f"user{i}", "noreply@example.com"),
+        ))
+    enqueue_ms = (time.perf_counter() - started) * 1000
+
+    # Ожидание доставки (включая повтор)
+    deadline = time.monotonic() + 10
+    while outbox.sent < len(recipients) and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+
+    await outbox.stop()
+    await server.stop()
+    stats = outbox.stats()
+
+    checks = [
+        (f"Постановка {len(recipients)} писем в очередь: {enqueue_ms:.2f} мс", enqueue_ms < 100),
+        (f"Доставлено {len(server.messages)} из {len(recipients)}", len(server.messages) == len(recipients)),
+        (f"Повторная попытка после 451: retried={stats['retried']}", stats["retried"] == 1),
+        (f"SMTP соединений: {server.connections}, пакетов: {stats['batches']}", server.connections == 1),
+    ]
+    for title, passed in checks:
+        print(f"{'✅' if passed else '❌'} {title}")
+    return all(passed for _, passed in checks)
+
+
+async def main():
+    """Главная функция"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_EMAILS
+
+    print("=" * 60)
+    print("Проверка очереди писем (локальный SMTP)")
+    print("=" * 60)
+
+    ok = await check_outbox(count)
+
+    print("=" * 60)
+    print("Готово!" if ok else "Проверка не пройдена")
+    print("=" * 60)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""
+Проверка лимита попыток входа по IP при подмене X-Forwarded-For
+
+Запуск: python -m app.scripts.check_login_rate_limit
+
+Клиент перебирает разные username и на каждый запрос подставляет новый
+X-Forwarded-For. Лимит по IP должен сработать (429) после
+LOGIN_ATTEMPTS_IP_LIMIT попыток - при прямом подключении и за одним
+доверенным прокси (адрес, дописанный прокси, клиент подделать не может).
+Ответы до срабатывания лимита не важны (БД может быть недоступна).
+"""
+import sys
+from pathlib import Path
+
+# Добавляем путь к корню проекта
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import logging
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import settings
+from app.core.rate_limit import MemoryBackend, rate_limiter
+
+
+def attempts_until_429(client: TestClient, proxy_hop: str = "") -> int:
+    """Номер попытки, получившей 429 (0 - лимит не сработал)"""
+    limit = settings.LOGIN_ATTEMPTS_IP_LIMIT
+    for attempt in range(1, limit + 3):
+        forwarded = f"10.0.{attempt // 256}.{attempt % 256}"
+        if proxy_hop:
+            forwarded += f", {proxy_hop}"
+        response = client.post(
+            "/auth/login",
+            json={"username": f"user{attempt}", "password": "wrong-password"},
+            headers={"X-Forwarded-For": forwarded},
+        )
+        if response.status_code == 429:
+            return attempt
+    return 0
+
+
+def main():
+    """Главная функция"""
+    logging.disable(logging.ERROR)
+    limit = settings.LOGIN_ATTEMPTS_IP_LIMIT
+
+    print("=" * 60)
+    print(f"Лимит входа по IP ({limit} попыток) при подмене X-Forwarded-For")
+    print("=" * 60)
+
+    client = TestClient(app, raise_server_exceptions=False)
+    ok = True
+    for proxies, title, proxy_hop in [
+        (0, "прямое подключение", ""),
+        (1, "за доверенным прокси", "203.0.113.7"),
+    ]:
+        settings.TRUSTED_PROXY_COUNT = proxies
+        rate_limiter.backend = MemoryBackend()
+        rejected = attempts_until_429(client, proxy_hop)
+        passed = rejected == limit + 1
+        ok = ok and passed
+        print(f"{'✅' if passed else '❌'} {title}: 429 на попытке {rejected or 'нет'}")
+
+    print("=" * 60)
+    print("✅ Подмена X-Forwarded-For не обходит лимит" if ok else "❌ Лимит по IP обходится подменой заголовка")
+    print("=" * 60)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
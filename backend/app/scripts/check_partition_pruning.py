@@ -0,0 +1,123 @@
+"""
+Проверка отсечения секций audit_log (partition pruning) через EXPLAIN
+
+Запуск: python -m app.scripts.check_partition_pruning
+Для каждого набора фильтров из /admin/logs строится тот же запрос, что и
+в app.api.logs, и проверяется, что план читает ровно секции нужных месяцев.
+"""
+import asyncio
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+# Добавляем путь к корню проекта
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy import select, func, and_
+from app.db.database import AsyncSessionLocal
+from app.db.explain import explain
+from app.db.models.audit_log import AuditLog, OperationType, StatusType
+from app.db.partitions import add_months, partition_name, ensure_partitions
+from app.api.logs import build_log_filters
+
+
+def scanned_relations(plan: dict) -> set:
+    """Имена таблиц, которые читает план (рекурсивно по узлам)"""
+    relations = set()
+    if "Relation Name" in plan:
+        relations.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        relations |= scanned_relations(child)
+    return relations
+
+
+def build_cases(today: date):
+    """Наборы фильтров и ожидаемые секции"""
+    current = date(today.year, today.month, 1)
+    previous = add_months(current, -1)
+    last_day = add_months(current, 1).toordinal() - 1
+    month_end = date.fromordinal(last_day)
+
+    return [
+        (
+            "Один месяц",
+            dict(from_date=current.isoformat(), to_date=month_end.isoformat()),
+            {partition_name(current)},
+        ),
+        (
+            "Граница двух месяцев",
+            dict(from_date=date(previous.year, previous.month, 20).isoformat(), to_date=date(current.year, current.month, 5).isoformat()),
+            {partition_name(previous), partition_name(current)},
+        ),
+        (
+            "Один месяц + операция + статус",
+            dict(
+                from_date=current.isoformat(),
+                to_date=month_end.isoformat(),
+                operation=OperationType.LOGIN_FAILED,
+                status=StatusType.FAILED,
+            ),
+            {partition_name(current)},
+        ),
+        (
+            "Один месяц + username + IP",
+            dict(from_date=current.isoformat(), to_date=month_end.isoformat(), username="adm", ip_address="127.0.0.1"),
+            {partition_name(current)},
+        ),
+    ]
+
+
+async def check_pruning() -> bool:
+    """Проверка всех наборов фильтров; True если все прошли"""
+    ok = True
+    async with AsyncSessionLocal() as db:
+        await ensure_partitions(await db.connection(), months_ahead=1)
+        # Обеспечиваем наличие секции прошлого месяца для проверки границы
+        previous_month = add_months(date.today().replace(day=1), -1)
+        await ensure_partitions(
+            await db.connection(),
+            months_ahead=0,
+            now=datetime(previous_month.year, previous_month.month, 1, tzinfo=timezone.utc),
+        )
+
+        for title, filters_kwargs, expected in build_cases(datetime.now(timezone.utc).date()):
+            filters = build_log_filters(**filters_kwargs)
+            queries = {
+                "page": select(AuditLog).where(and_(*filters)).order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(50),
+                "count": select(func.count()).select_from(AuditLog).where(and_(*filters)),
+            }
+            for kind, query in queries.items():
+                plan = await explain(db, query)
+                relations = scanned_relations(plan) - {"audit_log"}
+                # Ровно ожидаемые секции: план без секций - тоже ошибка
+                if relations == expected:
+                    print(f"✅ {title} [{kind}]: {', '.join(sorted(relations))}")
+                else:
+                    ok = False
+                    problems = []
+                    if relations - expected:
+                        problems.append(f"лишние секции {', '.join(sorted(relations - expected))}")
+                    if expected - relations:
+                        problems.append(f"не читаются {', '.join(sorted(expected - relations))}")
+                    print(f"❌ {title} [{kind}]: {'; '.join(problems)}")
+
+        await db.rollback()
+    return ok
+
+
+async def main():
+    """Главная функция"""
+    print("=" * 60)
+    print("Проверка partition pruning для /admin/logs")
+    print("=" * 60)
+
+    ok = await check_pruning()
+
+    print("=" * 60)
+    print("Готово!" if ok else "Обнаружены запросы без отсечения секций")
+    print("=" * 60)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -208,7 +208,7 @@ export default function AdminLogsPage() {
       {/* Stats */}
       {logsData && (
         <div className="mb-4 text-gray-600">
-          Найдено записей: <span className="font-bold">{logsData.total}</span>
+          Найдено записей: <span className="font-bold">{logsData.is_estimate ? '≈ ' : ''}{logsData.total}</span>
           {' | '}
           Страница: <span className="font-bold">{logsData.page} из {totalPages}</span>
         </div>
@@ -196,9 +196,12 @@ export interface AuditLog {
 
 export interface LogsResponse {
   total: number;
+  is_estimate?: boolean;
   page: number;
   limit: number;
   logs: AuditLog[];
+  next_cursor?: string | null;
+  prev_cursor?: string | null;
 }
 
 // ============= Auth API =============
@@ -350,6 +353,7 @@ export const adminAPI = {
   // Logs
   getLogs: async (params?: {
     page?: number;
+    cursor?: string;
     limit?: number;
     from_date?: string;
     to_date?: string;